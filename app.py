@@ -8,6 +8,9 @@ from flask import Flask, request
 from flask_babel import Babel, _
 from flask_static_digest import FlaskStaticDigest
 from galerie_flask.db import db
+from galerie_flask.miniflux_admin import init_session_touches
+from galerie_flask.history_recorder import history_recorder
+from galerie_flask.housekeeping import housekeeping_scheduler
 from galerie_flask.actions_blueprint import actions_blueprint
 from galerie_flask.pages_blueprint import pages_blueprint
 from galerie_flask.actions.actions_routes import actions_bp
@@ -51,6 +54,9 @@ if 'SQLALCHEMY_DATABASE_URI' in os.environ:
     db.init_app(app)
     with app.app_context():
         db.create_all()
+    init_session_touches(app)
+    history_recorder.init_app(app)
+    housekeeping_scheduler.init_app(app)
 
 
 @app.template_filter('format_count')
@@ -136,6 +142,37 @@ def migrate_database():
     run_migrations()
 
 
+@app.cli.command()
+def compact_item_view_history():
+    """Move entries of legacy item view history rows into the deduplicated entry store."""
+    from galerie_flask.entry_store import compact_legacy_history
+    result = compact_legacy_history(on_batch=lambda progress: print(f"Moved {progress.moved} view(s)"))
+    for uuid in result.skipped_uuids:
+        print(f"Skipped view {uuid}")
+    print(f"\nMoved {result.moved} view(s). Run VACUUM FULL item_view_history to give the space back.")
+
+
+@app.cli.command()
+def trim_item_view_history():
+    """Trim the item view history of every user to their history limit."""
+    from galerie_flask.history_retention import recount_history, sweep_history, retention_metrics
+    recount_history()
+    sweep_history()
+    for name, value in retention_metrics.stats().items():
+        print(f"{name}: {value}")
+
+
+@app.cli.command()
+def housekeeping():
+    """Delete expired sessions and old jobs and trim item view history, unless another process is doing it already."""
+    from galerie_flask.housekeeping import run_housekeeping, task_timings
+    if not run_housekeeping(only_if_due=False):
+        print("Housekeeping is already running elsewhere.")
+        return
+    for name, timing in task_timings.stats().items():
+        print(f"{name}: {timing['last_rows']} row(s) in {timing['last_seconds']}s")
+
+
 def read_svg_as_base64(filepath):
     with open(filepath, 'r') as file:
         svg_content = file.read()
@@ -0,0 +1,68 @@
+"""Time the per-entry URL rewriting of a Nitter entry with 3 images and 1 video.
+
+    python benchmarks/url_rewriting.py [tree]
+
+`tree` defaults to this checkout. To compare with the helpers from before the shared UrlRewriter, run it again
+on a checkout of the commit before it, e.g. `git worktree add /tmp/before <commit>~1`.
+"""
+import os
+import sys
+import base64
+import timeit
+
+
+NITTER_BASE_URL = 'http://nitter'
+MEDIA_PROXY_CUSTOM_URL = 'http://galerie-reader-media'
+# rendered_item signs media urls, any key will do
+MEDIA_PROXY_ENV = {
+    'GALERIE_MEDIA_PROXY_BASE_URL': 'https://media.example/p',
+    'GALERIE_MEDIA_PROXY_HMAC_KEY': base64.b64encode(b'k' * 32).decode(),
+    'GALERIE_MEDIA_PROXY_URL_TTL': '300',
+}
+ITERATIONS = 20000
+
+
+def proxied(url: str) -> str:
+    return f'{MEDIA_PROXY_CUSTOM_URL}/{base64.urlsafe_b64encode(url.encode()).decode()}'
+
+
+def main():
+    tree = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..')
+    sys.path.insert(0, os.path.abspath(tree))
+    os.environ['NITTER_BASE_URL'] = NITTER_BASE_URL
+    os.environ['MEDIA_PROXY_CUSTOM_URL'] = MEDIA_PROXY_CUSTOM_URL
+    for name, value in MEDIA_PROXY_ENV.items():
+        os.environ.setdefault(name, value)
+
+    from galerie import twitter
+    from galerie.miniflux_aggregator import entry_dict_to_item
+    from galerie.rendered_item import convert_rendered_item
+
+    images = ''.join(f'<img src="{proxied(f"{NITTER_BASE_URL}/pic/media%2Fabc{i}.jpg")}">' for i in range(3))
+    video = f'<video poster="{proxied(f"{NITTER_BASE_URL}/pic/thumb.jpg")}"><source src="https://video.twimg.com/v.mp4"></video>'
+    entry = {
+        'id': 1,
+        'url': f'{NITTER_BASE_URL}/foo/status/1#m',
+        'content': f'{images}{video}<p>hello {NITTER_BASE_URL}/foo/status/1</p>',
+        'enclosures': None,
+        'title': 'RT by @a: hi',
+        'feed': {'title': 'Foo / Twitter', 'category': {'id': 1, 'title': 'g'}},
+        'created_at': '2024-01-01T00:00:00+00:00',
+        'feed_id': 3,
+        'status': 'unread',
+    }
+    item = entry_dict_to_item(entry)
+
+    def rewrite_entry_urls():
+        # the URL work of entry_dict_to_item and convert_rendered_item, without the HTML parsing
+        if twitter.is_nitter_url(entry['url']):
+            twitter.fix_nitter_url(entry['url'])
+            twitter.fix_nitter_urls_in_text(f'hello {NITTER_BASE_URL}/foo')
+        convert_rendered_item(item, 4)
+
+    seconds = timeit.timeit(rewrite_entry_urls, number=ITERATIONS)
+    print(f'{os.path.abspath(tree)}: {seconds / ITERATIONS * 1e6:.1f} us/entry')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+from sentry_sdk import capture_exception
+
+
+BULK_FEED_OPS_CONCURRENCY = 8
+
+
+@dataclass
+class BulkFeedResult:
+    succeeded: List[str] = field(default_factory=list)
+    # fid -> what went wrong
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+class BulkFeedOpFailed(Exception):
+    def __init__(self, total: int, result: BulkFeedResult):
+        super().__init__(f"{len(result.failed)} of {total} feed operations failed: {result.failed}")
+        self.result = result
+
+
+def run_bulk_feed_op(fids: Iterable[str], op: Callable[[str], None]) -> BulkFeedResult:
+    """Apply `op` to every feed, BULK_FEED_OPS_CONCURRENCY at a time, carrying on past the ones that fail."""
+    fids = list(dict.fromkeys(fids))
+    result = BulkFeedResult()
+    if not fids:
+        return result
+
+    def run(fid: str) -> Optional[Exception]:
+        try:
+            op(fid)
+            return None
+        except Exception as e:
+            return e
+
+    first_error = None
+    with ThreadPoolExecutor(max_workers=min(BULK_FEED_OPS_CONCURRENCY, len(fids)), thread_name_prefix='bulk-feed-op') as executor:
+        for fid, error in zip(fids, executor.map(run, fids)):
+            if error is None:
+                result.succeeded.append(fid)
+                continue
+            result.failed[fid] = str(error) or type(error).__name__
+            first_error = first_error or error
+
+    if first_error:
+        # one report per batch, with the first failure's traceback attached
+        try:
+            raise BulkFeedOpFailed(len(fids), result) from first_error
+        except BulkFeedOpFailed as e:
+            capture_exception(e)
+    return result
@@ -0,0 +1,197 @@
+from typing import Any, Callable, Dict, List, Optional
+from .item import Item
+from .group import Group
+from .feed import Feed
+from .feed_icon import FeedIcon
+from .rss_aggregator import RssAggregator, ConnectionInfo
+from .bulk_feed_ops import BulkFeedResult
+from .ttl_cache import TtlCache
+
+
+CACHING_AGGREGATOR_MAX_SIZE = 1024
+# the username of an account never changes
+USERNAME_TTL_SECONDS = 24 * 60 * 60
+
+_MISSING = object()
+
+
+class CachingAggregator(RssAggregator):
+    """Memoizes the feed and group reads of another aggregator per request, and the username across them."""
+
+    def __init__(self, backend: RssAggregator, cache: Optional[TtlCache[tuple, Any]] = None):
+        self.backend = backend
+        # only what never changes is kept across requests, every worker process has a cache of its own
+        self._cache: TtlCache[tuple, Any] = cache if cache is not None else TtlCache(
+            ttl_seconds=USERNAME_TTL_SECONDS,
+            max_size=CACHING_AGGREGATOR_MAX_SIZE,
+        )
+        self._memo: Dict[tuple, Any] = {}
+
+    def for_request(self) -> 'CachingAggregator':
+        return CachingAggregator(self.backend, self._cache)
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+    def _cached(self, key: tuple, load: Callable[[], Any], ttl_seconds: Optional[float] = None) -> Any:
+        """Memoized for the request, and with `ttl_seconds` also kept for later requests of this worker."""
+        value = self._memo.get(key, _MISSING)
+        if value is _MISSING:
+            if ttl_seconds is not None:
+                value = self._cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = load()
+                if ttl_seconds is not None:
+                    self._cache.set(key, value, ttl_seconds)
+            self._memo[key] = value
+        return value
+
+    def _forget_where(self, predicate: Callable[[tuple, Any], bool]):
+        for key in [key for key, value in list(self._memo.items()) if predicate(key, value)]:
+            self._memo.pop(key, None)
+
+    def _forget(self, *keys: tuple):
+        self._forget_where(lambda key, _: key in keys)
+
+    def _forget_group_feeds(self, gid: Optional[str]):
+        # without knowing the group, drop the feed lists of all of them
+        self._forget_where(lambda key, _: key[0] == 'group_feeds' and (gid is None or key[1] == gid))
+
+    def _forget_feeds_of_group(self, gid: str):
+        self._forget_where(lambda key, value: key[0] == 'feed' and value.gid == gid)
+        self._forget(('feeds',), ('group_feeds', gid))
+
+    def _known_gid(self, fid: str) -> Optional[str]:
+        for key in (('feed', fid), ('feeds',)):
+            value = self._memo.get(key, _MISSING)
+            if value is _MISSING:
+                continue
+            for feed in value if isinstance(value, list) else [value]:
+                if feed.fid == fid:
+                    return feed.gid
+        return None
+
+    def invalidate_feeds(self):
+        """Drop all cached feeds, for changes made to them behind this class' back."""
+        self._forget_where(lambda key, _: key[0] in ('feeds', 'feed', 'group_feeds'))
+
+    def get_groups(self) -> List[Group]:
+        return list(self._cached(('groups',), self.backend.get_groups))
+
+    def get_items(self, count: int, from_iid_exclusive: Optional[str], group_id: Optional[str], sort_by_id_descending: bool, include_read: bool, max_media: Optional[int] = None) -> List[Item]:
+        return self.backend.get_items(count, from_iid_exclusive, group_id, sort_by_id_descending, include_read, max_media)
+
+    def get_unread_items_count_by_group_ids(self, gids: List[str], include_read: bool) -> Dict[str, int]:
+        return self.backend.get_unread_items_count_by_group_ids(gids, include_read)
+
+    def mark_all_group_items_as_read(self, group_id: str):
+        self.backend.mark_all_group_items_as_read(group_id)
+
+    def mark_all_items_as_read(self):
+        self.backend.mark_all_items_as_read()
+
+    def mark_items_as_read(self, iids: List[str]):
+        self.backend.mark_items_as_read(iids)
+
+    def connection_info(self) -> ConnectionInfo:
+        return self.backend.connection_info()
+
+    def get_feeds(self) -> List[Feed]:
+        return list(self._cached(('feeds',), self.backend.get_feeds))
+
+    def get_feed_items_by_iid_descending(self, fid: str, max_media: Optional[int] = None) -> List[Item]:
+        return self.backend.get_feed_items_by_iid_descending(fid, max_media)
+
+    def get_feed(self, fid: str) -> Feed:
+        return self._cached(('feed', fid), lambda: self.backend.get_feed(fid))
+
+    def find_feed_by_fid(self, fid: str) -> Feed:
+        return self.backend.find_feed_by_fid(fid)
+
+    def find_feed_by_url(self, finding_url: str) -> Optional[Feed]:
+        return self.backend.find_feed_by_url(finding_url)
+
+    def update_feed_group(self, fid: str, gid: str):
+        old_gid = self._known_gid(fid)
+        self.backend.update_feed_group(fid, gid)
+        self._forget(('groups',), ('feeds',), ('feed', fid), ('group_feeds', gid))
+        self._forget_group_feeds(old_gid)
+
+    def add_feed(self, feed_url: str, gid: str) -> Optional[str]:
+        fid = self.backend.add_feed(feed_url, gid)
+        if fid:
+            self._forget(('groups',), ('feeds',), ('group_feeds', gid))
+        return fid
+
+    def delete_feed(self, fid: str):
+        gid = self._known_gid(fid)
+        self.backend.delete_feed(fid)
+        self._forget(('groups',), ('feeds',), ('feed', fid))
+        self._forget_group_feeds(gid)
+
+    def enable_feed(self, fid: str):
+        gid = self._known_gid(fid)
+        self.backend.enable_feed(fid)
+        self._forget(('feeds',), ('feed', fid))
+        self._forget_group_feeds(gid)
+
+    def disable_feed(self, fid: str):
+        gid = self._known_gid(fid)
+        self.backend.disable_feed(fid)
+        self._forget(('feeds',), ('feed', fid))
+        self._forget_group_feeds(gid)
+
+    def _forget_feeds(self, fids: List[str], new_gid: Optional[str] = None):
+        # after a bulk operation, once for the whole batch rather than once per feed
+        gids = {self._known_gid(fid) for fid in fids}
+        if new_gid is not None:
+            gids.add(new_gid)
+        self._forget(('groups',), ('feeds',), *[('feed', fid) for fid in fids])
+        for gid in gids:
+            self._forget_group_feeds(gid)
+
+    def delete_feeds(self, fids: List[str]) -> BulkFeedResult:
+        result = self.backend.delete_feeds(fids)
+        self._forget_feeds(fids)
+        return result
+
+    def move_feeds(self, fids: List[str], gid: str) -> BulkFeedResult:
+        result = self.backend.move_feeds(fids, gid)
+        self._forget_feeds(fids, gid)
+        return result
+
+    def set_feeds_enabled(self, fids: List[str], enabled: bool) -> BulkFeedResult:
+        result = self.backend.set_feeds_enabled(fids, enabled)
+        self._forget_feeds(fids)
+        return result
+
+    def mark_last_unread(self, count: int):
+        self.backend.mark_last_unread(count)
+
+    def get_item(self, iid: str) -> Item:
+        return self.backend.get_item(iid)
+
+    def get_feed_icon(self, fid: str) -> FeedIcon:
+        return self.backend.get_feed_icon(fid)
+
+    def create_group(self, title: str) -> str:
+        gid = self.backend.create_group(title)
+        self._forget(('groups',))
+        return gid
+
+    def get_feeds_by_group_id(self, gid: str) -> List[Feed]:
+        return list(self._cached(('group_feeds', gid), lambda: self.backend.get_feeds_by_group_id(gid)))
+
+    def rename_group(self, gid: str, new_title: str):
+        self.backend.rename_group(gid, new_title)
+        # feeds carry their group's title
+        self._forget(('groups',))
+        self._forget_feeds_of_group(gid)
+
+    def delete_group(self, gid: str):
+        self.backend.delete_group(gid)
+        self._forget(('groups',))
+        self._forget_feeds_of_group(gid)
+
+    def get_username(self) -> str:
+        return self._cached(('username',), self.backend.get_username, USERNAME_TTL_SECONDS)
@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .html_extraction import ExtractedHtml, extract_html
+
+
+EXTRACTION_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# rough per-entry overhead of the cached objects on top of their strings
+ENTRY_OVERHEAD_BYTES = 200
+MEDIA_OVERHEAD_BYTES = 100
+
+
+def _estimate_size(extracted: ExtractedHtml) -> int:
+    size = ENTRY_OVERHEAD_BYTES + len(extracted.text)
+    for medium in extracted.media:
+        size += MEDIA_OVERHEAD_BYTES + len(medium.src) + len(medium.poster)
+    return size
+
+
+class ExtractionCache(object):
+    """Process-wide LRU of extracted entry HTML, keyed by entry id, HTML hash and media cap, bounded by estimated memory."""
+
+    def __init__(self, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Tuple[str, bytes, Optional[int]], Tuple[ExtractedHtml, int]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_extract(self, entry_id: str, html: str, max_media: Optional[int] = None) -> ExtractedHtml:
+        key = (entry_id, hashlib.blake2b(html.encode(), digest_size=16).digest(), max_media)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return cached[0]
+            self._misses += 1
+
+        extracted = extract_html(html, max_media)
+        size = _estimate_size(extracted)
+        if size > self.max_bytes:
+            return extracted
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (extracted, size)
+                self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+        return extracted
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+extraction_cache = ExtractionCache()
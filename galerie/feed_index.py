@@ -0,0 +1,109 @@
+import time
+import threading
+import dataclasses
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from .feed import Feed
+from .twitter import extract_twitter_handle_from_url
+
+
+FEED_INDEX_TTL_SECONDS = 10 * 60
+
+
+def normalize_feed_url(url: str) -> str:
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), parts.query, ''))
+
+
+class FeedIndex:
+    """Per-user lookup of feeds by fid, normalized URL and lowercase Twitter handle."""
+
+    def __init__(self, ttl_seconds: float = FEED_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._built_at: Optional[float] = None
+        self._by_fid: Dict[str, Feed] = {}
+        # fids in listing order, so duplicates resolve to the same feed a linear scan would find
+        self._fids_by_url: Dict[str, List[str]] = {}
+        self._fids_by_handle: Dict[str, List[str]] = {}
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            return self._built_at is not None and time.monotonic() - self._built_at < self.ttl_seconds
+
+    def build(self, feeds: Iterable[Feed]):
+        with self._lock:
+            self._by_fid = {}
+            self._fids_by_url = {}
+            self._fids_by_handle = {}
+            for feed in feeds:
+                self._add(feed)
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+            self._by_fid = {}
+            self._fids_by_url = {}
+            self._fids_by_handle = {}
+
+    def get(self, fid: str) -> Optional[Feed]:
+        with self._lock:
+            return self._by_fid.get(fid)
+
+    def find_by_url(self, url: str) -> Optional[Feed]:
+        """The feed with the given URL, or else the first feed of the same Twitter handle."""
+        handle = extract_twitter_handle_from_url(url)
+        with self._lock:
+            fids = self._fids_by_url.get(normalize_feed_url(url))
+            if not fids and handle:
+                fids = self._fids_by_handle.get(handle)
+            return self._by_fid[fids[0]] if fids else None
+
+    def put(self, feed: Feed):
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(feed.fid)
+            self._add(feed)
+
+    def remove(self, fid: str):
+        with self._lock:
+            self._remove(fid)
+
+    def move(self, fid: str, gid: str):
+        with self._lock:
+            feed = self._by_fid.get(fid)
+            if feed is None:
+                return
+            group_title = next((f.group_title for f in self._by_fid.values() if f.gid == gid), None)
+            if group_title is None:
+                # no other feed tells us the group's title, start over with the next listing
+                self._built_at = None
+                return
+            self._by_fid[fid] = dataclasses.replace(feed, gid=gid, group_title=group_title)
+
+    def _add(self, feed: Feed):
+        self._by_fid[feed.fid] = feed
+        self._fids_by_url.setdefault(normalize_feed_url(feed.url), []).append(feed.fid)
+        handle = extract_twitter_handle_from_url(feed.url)
+        if handle:
+            self._fids_by_handle.setdefault(handle, []).append(feed.fid)
+
+    def _remove(self, fid: str):
+        feed = self._by_fid.pop(fid, None)
+        if feed is None:
+            return
+        for key, fids_by_key in ((normalize_feed_url(feed.url), self._fids_by_url),
+                                 (extract_twitter_handle_from_url(feed.url), self._fids_by_handle)):
+            fids = fids_by_key.get(key)
+            if fids and fid in fids:
+                fids.remove(fid)
+                if not fids:
+                    del fids_by_key[key]
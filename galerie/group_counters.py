@@ -0,0 +1,134 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from .item import Item
+
+
+GROUP_COUNTERS_TTL_SECONDS = 30
+REMEMBERED_UNREAD_ITEMS_MAX_SIZE = 5000
+
+
+class GroupCounters:
+    """Per-user unread/read counts by group, fetched once per TTL and adjusted locally as items are read."""
+
+    def __init__(self, ttl_seconds: float = GROUP_COUNTERS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._unread: Optional[Dict[str, int]] = None
+        self._unread_fetched_at = 0.0
+        self._read: Optional[Dict[str, int]] = None
+        self._read_fetched_at = 0.0
+        self._unread_item_gids: OrderedDict[str, str] = OrderedDict()
+        self._pending_read_gids: Dict[str, str] = {}
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return time.monotonic() - fetched_at < self.ttl_seconds
+
+    def get_unread_counts(self) -> Optional[Dict[str, int]]:
+        with self._lock:
+            if self._unread is None or not self._is_fresh(self._unread_fetched_at):
+                return None
+            return dict(self._unread)
+
+    def get_read_counts(self) -> Optional[Dict[str, int]]:
+        with self._lock:
+            if self._read is None or not self._is_fresh(self._read_fetched_at):
+                return None
+            return dict(self._read)
+
+    def _pending_reads_by_gid(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for gid in self._pending_read_gids.values():
+            counts[gid] = counts.get(gid, 0) + 1
+        return counts
+
+    def set_unread_counts(self, counts: Dict[str, int]):
+        with self._lock:
+            self._unread = dict(counts)
+            for gid, count in self._pending_reads_by_gid().items():
+                if gid in self._unread:
+                    self._unread[gid] = max(self._unread[gid] - count, 0)
+            self._unread_fetched_at = time.monotonic()
+
+    def set_read_counts(self, counts: Dict[str, int]):
+        with self._lock:
+            self._read = dict(counts)
+            for gid, count in self._pending_reads_by_gid().items():
+                self._read[gid] = self._read.get(gid, 0) + count
+            self._read_fetched_at = time.monotonic()
+
+    def forget_pending_reads(self, iids: Iterable[str]):
+        """The reads of these items reached upstream, fresh counts include them from now on."""
+        with self._lock:
+            for iid in iids:
+                self._pending_read_gids.pop(iid, None)
+
+    def drop_pending_reads(self, iids: Iterable[str]):
+        """The reads of these items were given up on, so the counts adjusted for them are wrong now."""
+        with self._lock:
+            for iid in iids:
+                self._pending_read_gids.pop(iid, None)
+            self._unread = None
+            self._read = None
+
+    def invalidate(self):
+        with self._lock:
+            self._unread = None
+            self._read = None
+
+    def remember_items(self, items: Iterable[Item]):
+        with self._lock:
+            for item in items:
+                if not item.unread_or_not:
+                    continue
+                self._unread_item_gids[item.iid] = item.group.gid
+                self._unread_item_gids.move_to_end(item.iid)
+            while len(self._unread_item_gids) > REMEMBERED_UNREAD_ITEMS_MAX_SIZE:
+                self._unread_item_gids.popitem(last=False)
+
+    def apply_items_read(self, iids: List[str]):
+        with self._lock:
+            gids = []
+            known_everything = True
+            for iid in iids:
+                gid = self._unread_item_gids.pop(iid, None)
+                if gid is None:
+                    known_everything = False
+                    continue
+                gids.append(gid)
+                self._pending_read_gids[iid] = gid
+            if not known_everything:
+                # we can't tell which group (or whether it was unread at all), recompute next time
+                self._unread = None
+                self._read = None
+                return
+            for gid in gids:
+                self._move_to_read(gid, 1)
+
+    def apply_group_read(self, gid: str):
+        with self._lock:
+            if self._unread is not None:
+                self._move_to_read(gid, self._unread.get(gid, 0))
+            self._forget_items(lambda item_gid: item_gid == gid)
+            # upstream has them all as read now, queued reads in the group don't change its counts anymore
+            self._pending_read_gids = {iid: item_gid for iid, item_gid in self._pending_read_gids.items() if item_gid != gid}
+
+    def apply_all_read(self):
+        with self._lock:
+            if self._unread is not None:
+                for gid in list(self._unread.keys()):
+                    self._move_to_read(gid, self._unread[gid])
+            self._forget_items(lambda _: True)
+            self._pending_read_gids = {}
+
+    def _move_to_read(self, gid: str, count: int):
+        if self._unread is not None and gid in self._unread:
+            count = min(count, self._unread[gid])
+            self._unread[gid] -= count
+        if self._read is not None:
+            self._read[gid] = self._read.get(gid, 0) + count
+
+    def _forget_items(self, predicate):
+        for iid in [iid for iid, gid in self._unread_item_gids.items() if predicate(gid)]:
+            del self._unread_item_gids[iid]
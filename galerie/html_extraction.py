@@ -0,0 +1,255 @@
+import os
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+from bs4.dammit import EntitySubstitution
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+# tags that never have children, mirroring BeautifulSoup's HTML tree builder
+VOID_TAGS = {
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image', 'img', 'input',
+    'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr',
+}
+
+# strings inside these tags are not part of BeautifulSoup's get_text()
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+
+@dataclass
+class ItemMedia:
+    kind: str  # 'image' or 'video'
+    src: str
+    poster: str = ''
+
+
+@dataclass
+class ExtractedHtml:
+    text: str
+    media: List[ItemMedia]
+    image_count: int
+    video_count: int
+
+
+class _Collector(object):
+    """Collects what BeautifulSoup's get_text() and find_all(['img', 'video']) would, from parser events."""
+
+    def __init__(self, max_media: Optional[int] = None):
+        self.max_media = max_media
+        self.open_tags: List[str] = []
+        # void tags opened without "/>" are closed right away, and the next explicit end tag of that name is ignored
+        self.already_closed: List[str] = []
+        self.pending_data: List[str] = []
+        self.strings: List[str] = []
+        self.media: List[Optional[ItemMedia]] = []
+        # stored media known to be kept; past the cap, media are only counted
+        self.kept_count = 0
+        # [index into self.media or None if not stored, whether its first <source> was seen, its src] per open <video>
+        self.open_videos: List[list] = []
+        self.image_count = 0
+        self.video_count = 0
+
+    def _flush(self, included: Optional[bool] = None):
+        if not self.pending_data:
+            return
+        data = ''.join(self.pending_data)
+        self.pending_data = []
+        if included is None:
+            included = not any(tag in NON_TEXT_TAGS for tag in self.open_tags)
+        if included:
+            data = data.strip()
+            if data:
+                self.strings.append(data)
+
+    def data(self, data: str):
+        self.pending_data.append(data)
+
+    def boundary(self):
+        # comments, declarations and processing instructions end the current string and are not text themselves
+        self._flush()
+
+    def cdata(self, data: str):
+        self._flush()
+        self.pending_data.append(data)
+        self._flush(included=True)
+
+    def start(self, tag: str, attrs: Dict[str, str], self_closing: bool = False):
+        self._flush()
+
+        if tag == 'img':
+            self.image_count += 1
+            if self._storing():
+                self.media.append(ItemMedia(kind='image', src=attrs.get('src', '')))
+                self.kept_count += 1
+        elif tag == 'video':
+            index = None
+            if self._storing():
+                index = len(self.media)
+                self.media.append(ItemMedia(kind='video', src='', poster=attrs.get('poster', '')))
+            self.open_videos.append([index, False, ''])
+        elif tag == 'source':
+            for video in self.open_videos:
+                if not video[1]:
+                    video[1] = True
+                    video[2] = attrs.get('src', '')
+                    if video[0] is not None:
+                        self.media[video[0]].src = video[2]
+                        if video[2]:
+                            self.kept_count += 1
+
+        self.open_tags.append(tag)
+        if tag in VOID_TAGS and not self_closing:
+            self._pop_to(tag)
+            self.already_closed.append(tag)
+
+    def end(self, tag: str):
+        if tag in self.already_closed:
+            self.already_closed.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def _pop_to(self, tag: str):
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            popped = self.open_tags.pop()
+            if popped == 'video':
+                self._close_video()
+            if popped == tag:
+                break
+
+    def _storing(self) -> bool:
+        # a stored video still waiting for its <source> may be dropped, so only kept media count towards the cap
+        return self.max_media is None or self.kept_count < self.max_media
+
+    def _close_video(self):
+        index, _, src = self.open_videos.pop()
+        if src:
+            self.video_count += 1
+        elif index is not None:
+            self.media[index] = None
+
+    def close(self) -> ExtractedHtml:
+        self._flush()
+        while self.open_videos:
+            self._close_video()
+        media = [m for m in self.media if m is not None]
+        if self.max_media is not None:
+            media = media[:self.max_media]
+        return ExtractedHtml(
+            text=" ".join(self.strings),
+            media=media,
+            image_count=self.image_count,
+            video_count=self.video_count,
+        )
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, collector: _Collector):
+        # charrefs are resolved below exactly like BeautifulSoup's html.parser builder does
+        super().__init__(convert_charrefs=False)
+        self.collector = collector
+
+    @staticmethod
+    def _attrs(attrs) -> Dict[str, str]:
+        return {key: value if value is not None else '' for key, value in attrs}
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, self._attrs(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, self._attrs(attrs), self_closing=True)
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_charref(self, name):
+        if name.startswith('x'):
+            codepoint = int(name.lstrip('x'), 16)
+        elif name.startswith('X'):
+            codepoint = int(name.lstrip('X'), 16)
+        else:
+            codepoint = int(name)
+
+        data = None
+        if codepoint < 256:
+            # numeric references below 256 are often meant as windows-1252, e.g. &#147;
+            try:
+                data = bytearray([codepoint]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codepoint)
+            except (ValueError, OverflowError):
+                pass
+        self.collector.data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.collector.data(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data):
+        self.collector.boundary()
+
+    def handle_decl(self, decl):
+        self.collector.boundary()
+
+    def handle_pi(self, data):
+        self.collector.boundary()
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self.collector.cdata(data[len('CDATA['):])
+        else:
+            self.collector.boundary()
+
+
+class _LxmlTarget(object):
+    def __init__(self, collector: _Collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def comment(self, text):
+        self.collector.boundary()
+
+    def pi(self, target, data=None):
+        self.collector.boundary()
+
+    def close(self):
+        pass
+
+
+def _use_lxml() -> bool:
+    return etree is not None and os.environ.get('HTML_EXTRACTION_BACKEND', 'html.parser') == 'lxml'
+
+
+def extract_html(html: str, max_media: Optional[int] = None) -> ExtractedHtml:
+    """Extract the text and the first `max_media` ordered media of an entry's HTML in a single parsing pass."""
+    collector = _Collector(max_media)
+    if _use_lxml() and html.strip():
+        parser = etree.HTMLParser(target=_LxmlTarget(collector))
+        parser.feed(html)
+        parser.close()
+    else:
+        parser = _StdlibParser(collector)
+        parser.feed(html)
+        parser.close()
+    return collector.close()
@@ -1,5 +1,7 @@
 import datetime
+from typing import List
 from .group import Group
+from .html_extraction import ItemMedia
 from dataclasses import dataclass
 
 
@@ -15,3 +17,6 @@ class Item:
     fid: str
     text: str
     unread_or_not: bool
+    media: List[ItemMedia]
+    image_count: int
+    video_count: int
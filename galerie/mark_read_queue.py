@@ -0,0 +1,153 @@
+import time
+import atexit
+import threading
+from typing import Callable, Dict, Iterable, List, Set
+from sentry_sdk import capture_exception
+
+
+MARK_READ_FLUSH_INTERVAL_SECONDS = 2
+# flush right away once this many ids are waiting
+MARK_READ_FLUSH_SIZE = 100
+MARK_READ_CHUNK_SIZE = 250
+MARK_READ_RETRY_BASE_SECONDS = 1
+MARK_READ_RETRY_MAX_SECONDS = 60
+MARK_READ_MAX_ATTEMPTS = 6
+
+
+class MarkReadQueue(object):
+    """Entry ids of one user waiting to be marked as read upstream by the flusher thread."""
+
+    def __init__(self, write: Callable[[List[int]], None]):
+        self._write = write
+        self._lock = threading.Lock()
+        # serializes writes, so a flush on shutdown doesn't race the flusher thread for the same ids
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, None] = {}
+        self._in_flight: Set[int] = set()
+        self._attempts = 0
+        self._next_attempt_at = 0.0
+        self._on_flushed: List[Callable[[List[int]], None]] = []
+        self._on_dropped: List[Callable[[List[int]], None]] = []
+
+    def on_flushed(self, callback: Callable[[List[int]], None]):
+        """Call `callback` with the ids of every successful write."""
+        self._on_flushed.append(callback)
+
+    def on_dropped(self, callback: Callable[[List[int]], None]):
+        """Call `callback` with the ids of every write given up on after MARK_READ_MAX_ATTEMPTS."""
+        self._on_dropped.append(callback)
+
+    def add(self, entry_ids: Iterable[int]):
+        with self._lock:
+            for entry_id in entry_ids:
+                self._pending[entry_id] = None
+            size = len(self._pending)
+        _flusher.watch(self, urgent=size >= MARK_READ_FLUSH_SIZE)
+
+    def pending(self) -> Set[str]:
+        with self._lock:
+            return {str(entry_id) for entry_id in self._pending} | {str(entry_id) for entry_id in self._in_flight}
+
+    def is_due(self) -> bool:
+        with self._lock:
+            return bool(self._pending) and time.monotonic() >= self._next_attempt_at
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not self._pending and not self._in_flight
+
+    def flush(self, force: bool = False):
+        """Write everything pending, unless a previous failure asks to back off and `force` isn't set."""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending or (not force and time.monotonic() < self._next_attempt_at):
+                        return
+                    chunk = list(self._pending)[:MARK_READ_CHUNK_SIZE]
+                    for entry_id in chunk:
+                        del self._pending[entry_id]
+                    self._in_flight = set(chunk)
+
+                try:
+                    self._write(chunk)
+                except Exception as e:
+                    with self._lock:
+                        self._in_flight = set()
+                        self._attempts += 1
+                        dropped = self._attempts >= MARK_READ_MAX_ATTEMPTS
+                        if dropped:
+                            self._attempts = 0
+                            self._next_attempt_at = 0.0
+                        else:
+                            for entry_id in chunk:
+                                self._pending.setdefault(entry_id, None)
+                            delay = min(MARK_READ_RETRY_BASE_SECONDS * 2 ** (self._attempts - 1), MARK_READ_RETRY_MAX_SECONDS)
+                            self._next_attempt_at = time.monotonic() + delay
+                    if dropped:
+                        capture_exception(e)
+                        for callback in self._on_dropped:
+                            callback(chunk)
+                        continue
+                    if force:
+                        return
+                    continue
+
+                with self._lock:
+                    self._in_flight = set()
+                    self._attempts = 0
+                    self._next_attempt_at = 0.0
+                for callback in self._on_flushed:
+                    callback(chunk)
+
+
+class _Flusher(object):
+    """One daemon thread per worker process that flushes every queue with pending ids."""
+
+    def __init__(self):
+        # held until they are empty, so ids queued by an aggregator evicted from the registry are still written
+        self._queues: Set[MarkReadQueue] = set()
+        self._lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._thread = None
+
+    def watch(self, queue: MarkReadQueue, urgent: bool):
+        with self._lock:
+            self._queues.add(queue)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mark-read-flusher', daemon=True)
+                self._thread.start()
+        if urgent:
+            self._wake_up.set()
+
+    def _queues_snapshot(self) -> List[MarkReadQueue]:
+        with self._lock:
+            return list(self._queues)
+
+    def _run(self):
+        while True:
+            self._wake_up.wait(MARK_READ_FLUSH_INTERVAL_SECONDS)
+            self._wake_up.clear()
+            for queue in self._queues_snapshot():
+                if queue.is_due():
+                    try:
+                        queue.flush()
+                    except Exception as e:
+                        capture_exception(e)
+                self._release_if_empty(queue)
+
+    def _release_if_empty(self, queue: MarkReadQueue):
+        # under the lock, an add() racing with this re-watches the queue once its ids are in
+        with self._lock:
+            if queue.is_empty():
+                self._queues.discard(queue)
+
+    def flush_all(self):
+        for queue in self._queues_snapshot():
+            try:
+                queue.flush(force=True)
+            except Exception as e:
+                capture_exception(e)
+
+
+_flusher = _Flusher()
+atexit.register(_flusher.flush_all)
@@ -3,6 +3,8 @@ import hashlib
 import hmac
 import os
 import time
+from functools import lru_cache
+from typing import Optional
 
 if "GALERIE_MEDIA_PROXY_BASE_URL" not in os.environ:
     raise ValueError("GALERIE_MEDIA_PROXY_BASE_URL environment variable is not set.")
@@ -18,12 +20,41 @@ if len(hmac_key) != 32:
 if "GALERIE_MEDIA_PROXY_URL_TTL" not in os.environ:
     raise ValueError("GALERIE_MEDIA_PROXY_URL_TTL environment variable is not set.")
 url_ttl = int(os.environ["GALERIE_MEDIA_PROXY_URL_TTL"])
+# expiries are rounded to buckets of this size, so every url stays valid between half and all of url_ttl
+url_ttl_bucket = max(url_ttl // 2, 1)
+SIGNED_URL_MEMO_SIZE = 4096
 
 
 def sign_media_url(upstream_url: str) -> str:
-    exp = str(int(time.time()) + url_ttl)
+    """A proxy url for `upstream_url`, identical for every call within the same expiry bucket."""
+    exp = int(time.time()) // url_ttl_bucket * url_ttl_bucket + url_ttl
+    return _sign_media_url(upstream_url, exp)
+
+
+@lru_cache(maxsize=SIGNED_URL_MEMO_SIZE)
+def _sign_media_url(upstream_url: str, exp: int) -> str:
     msg = f"{exp}:{upstream_url}".encode()
     sig = hmac.new(hmac_key, msg, hashlib.sha256).digest()
     url_b64 = base64.urlsafe_b64encode(upstream_url.encode()).decode().rstrip("=")
     sig_b64 = base64.urlsafe_b64encode(sig).decode().rstrip("=")
     return f"{base_url}?url={url_b64}&exp={exp}&sig={sig_b64}"
+
+
+def _b64decode_unpadded(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def verify_media_url(url_b64: str, exp: str, sig_b64: str) -> Optional[str]:
+    """The upstream url of a url made by sign_media_url, or None if it is forged, malformed or expired."""
+    try:
+        upstream_url = _b64decode_unpadded(url_b64).decode()
+        sig = _b64decode_unpadded(sig_b64)
+        expires_at = int(exp)
+    except ValueError:
+        return None
+    if expires_at < time.time():
+        return None
+    expected = hmac.new(hmac_key, f"{exp}:{upstream_url}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(sig, expected):
+        return None
+    return upstream_url
@@ -2,13 +2,16 @@ import miniflux
 from datetime import datetime, timezone
 from urllib.parse import urlparse
 from typing import Any, List, Optional, Dict
-from bs4 import BeautifulSoup
 from .item import Item
 from .group import Group
 from .rss_aggregator import RssAggregator, ConnectionInfo
 from .feed import Feed
 from .twitter import fix_nitter_url, fix_nitter_rt_title, fix_nitter_urls_in_text, fix_nitter_rt_in_text, is_nitter_url, fix_nitter_feed_title
 from .feed_icon import FeedIcon
+from .group_counters import GroupCounters
+from .feed_index import FeedIndex
+from .mark_read_queue import MarkReadQueue
+from .extraction_cache import extraction_cache
 
 
 def _category_dict_to_group(category_dict: dict) -> Group:
@@ -23,7 +26,31 @@ def parse_published_at(date_string: str) -> datetime:
     return datetime.fromisoformat(date_string)
 
 
-def entry_dict_to_item(entry_dict: dict) -> Item:
+def trim_entry_dict(entry_dict: dict) -> dict:
+    """Only the parts of an entry that entry_dict_to_item reads, for keeping entries around compactly."""
+    return {
+        'id': entry_dict['id'],
+        'url': entry_dict['url'],
+        'title': entry_dict['title'],
+        'content': entry_dict['content'],
+        'enclosures': [
+            {'mime_type': enclosure['mime_type'], 'url': enclosure['url']}
+            for enclosure in entry_dict['enclosures'] or []
+        ],
+        'created_at': entry_dict['created_at'],
+        'status': entry_dict['status'],
+        'feed_id': entry_dict['feed_id'],
+        'feed': {
+            'title': entry_dict['feed']['title'],
+            'category': {
+                'id': entry_dict['feed']['category']['id'],
+                'title': entry_dict['feed']['category']['title'],
+            },
+        },
+    }
+
+
+def entry_dict_to_item(entry_dict: dict, max_media: Optional[int] = None) -> Item:
     url = entry_dict['url']
 
     html = entry_dict['content']
@@ -32,7 +59,8 @@ def entry_dict_to_item(entry_dict: dict) -> Item:
             if enclosure['mime_type'].startswith('image/'):
                 html += f'<img src="{enclosure["url"]}">'
 
-    text = BeautifulSoup(html, 'html.parser').get_text(" ", strip=True)
+    extracted = extraction_cache.get_or_extract(str(entry_dict['id']), html, max_media)
+    text = extracted.text
     title = entry_dict['title']
     feed_title = entry_dict['feed']['title']
 
@@ -54,6 +82,9 @@ def entry_dict_to_item(entry_dict: dict) -> Item:
         fid=str(entry_dict['feed_id']),
         text=text,
         unread_or_not=entry_dict['status'] == 'unread',
+        media=extracted.media,
+        image_count=extracted.image_count,
+        video_count=extracted.video_count,
     )
 
 
@@ -89,6 +120,19 @@ class MinifluxAggregator(RssAggregator):
         self.password = password
         self.client = miniflux.Client(base_url, username, password)
         self.managed_or_self_hosted = managed_or_self_hosted
+        self.counters = GroupCounters()
+        self.feed_index = FeedIndex()
+        self.user_id: Optional[int] = None
+        self.mark_read_queue = MarkReadQueue(lambda entry_ids: self.client.update_entries(entry_ids, 'read'))
+        self.mark_read_queue.on_flushed(lambda entry_ids: self.counters.forget_pending_reads(map(str, entry_ids)))
+        self.mark_read_queue.on_dropped(lambda entry_ids: self.counters.drop_pending_reads(map(str, entry_ids)))
+
+    def _apply_pending_reads(self, items: List[Item]) -> List[Item]:
+        pending = self.mark_read_queue.pending()
+        for item in items:
+            if item.iid in pending:
+                item.unread_or_not = False
+        return items
 
     def get_groups(self) -> List[Group]:
         _endpoint = self.client._get_endpoint("/categories?counts=true")
@@ -96,9 +140,13 @@ class MinifluxAggregator(RssAggregator):
         if _response.status_code != 200:
             self.client._handle_error_response(_response)
         res = _response.json()
+        # the same payload carries the unread count of every group, keep it for the header counts
+        self.counters.set_unread_counts({
+            str(category_dict['id']): category_dict.get('total_unread', 0) for category_dict in res
+        })
         return list(map(_category_dict_to_group, res))
 
-    def get_items(self, count: int, from_iid_exclusive: Optional[str], group_id: Optional[str], sort_by_id_descending: bool, include_read: bool) -> List[Item]:
+    def get_items(self, count: int, from_iid_exclusive: Optional[str], group_id: Optional[str], sort_by_id_descending: bool, include_read: bool, max_media: Optional[int] = None) -> List[Item]:
         kwargs = {
             "status": ['unread', 'read'] if include_read else 'unread',
             "order": 'id',
@@ -113,34 +161,53 @@ class MinifluxAggregator(RssAggregator):
         else:
             kwargs["after_entry_id"] = before_or_after_entry_id
 
+        pending = self.mark_read_queue.pending()
+        if pending and not include_read:
+            # entries whose read is still queued are filtered out below, ask for enough to fill the page anyway
+            kwargs["limit"] = count + min(len(pending), count)
+
         entries = self.client.get_entries(**kwargs)
 
-        return list(map(entry_dict_to_item, entries['entries']))
-   
-    def get_unread_items_count_by_group_ids(self, gids: List[str], include_read: bool) -> Dict[str, int]:
-        res = {}
-        for gid in gids:
-            res[gid] = 0
+        items = self._apply_pending_reads([entry_dict_to_item(entry, max_media) for entry in entries['entries']])
+        if not include_read:
+            items = [item for item in items if item.unread_or_not][:count]
+        self.counters.remember_items(items)
+        return items
 
-        feeds = self.get_feeds()
-        unread_feed_counters = self.client.get_feed_counters()["unreads"]
+    def _get_read_counts_by_group_id(self) -> Dict[str, int]:
+        res = {}
         read_feed_counters = self.client.get_feed_counters()["reads"]
+        for feed in self.get_feeds():
+            res[feed.gid] = res.get(feed.gid, 0) + read_feed_counters.get(feed.fid, 0)
+        return res
 
-        for feed in feeds:
-            feed_id = feed.fid
-            gid = feed.gid
-            if feed_id in unread_feed_counters:
-                res[gid] += unread_feed_counters[feed_id]
-            if include_read and feed_id in read_feed_counters:
-                res[gid] += read_feed_counters[feed_id]
-
+    def get_unread_items_count_by_group_ids(self, gids: List[str], include_read: bool) -> Dict[str, int]:
+        unread_counts = self.counters.get_unread_counts()
+        if unread_counts is None:
+            self.get_groups()
+            unread_counts = self.counters.get_unread_counts() or {}
+
+        res = {gid: unread_counts.get(gid, 0) for gid in gids}
+        if not include_read:
+            return res
+
+        read_counts = self.counters.get_read_counts()
+        if read_counts is None:
+            read_counts = self._get_read_counts_by_group_id()
+            self.counters.set_read_counts(read_counts)
+        for gid in gids:
+            res[gid] += read_counts.get(gid, 0)
         return res
     
     def mark_all_group_items_as_read(self, group_id: str):
         self.client.mark_category_entries_as_read(category_id=int(group_id))
+        self.counters.apply_group_read(group_id)
 
     def mark_all_items_as_read(self):
-        self.client.mark_user_entries_as_read(self.client.me()['id'])
+        if self.user_id is None:
+            self.user_id = self.client.me()['id']
+        self.client.mark_user_entries_as_read(self.user_id)
+        self.counters.apply_all_read()
 
     def mark_items_as_read(self, iids: List[str]):
         if not iids:
@@ -148,7 +215,9 @@ class MinifluxAggregator(RssAggregator):
         unique_ids = {int(iid) for iid in iids if iid.isdigit()}
         if not unique_ids:
             return
-        self.client.update_entries(list(unique_ids), 'read')
+        # written behind by the queue; until then the items read as read through this aggregator
+        self.mark_read_queue.add(unique_ids)
+        self.counters.apply_items_read([str(iid) for iid in unique_ids])
 
     def connection_info(self) -> ConnectionInfo:
         return ConnectionInfo(
@@ -157,21 +226,40 @@ class MinifluxAggregator(RssAggregator):
         )
 
     def get_feeds(self) -> List[Feed]:
-        return list(map(_feed_dict_to_feed, self.client.get_feeds()))
+        feeds = list(map(_feed_dict_to_feed, self.client.get_feeds()))
+        self.feed_index.build(feeds)
+        return feeds
+
+    def _get_feed_index(self) -> FeedIndex:
+        if not self.feed_index.is_fresh():
+            self.get_feeds()
+        return self.feed_index
 
-    def get_feed_items_by_iid_descending(self, fid: str) -> List[Item]:
+    def get_feed_items_by_iid_descending(self, fid: str, max_media: Optional[int] = None) -> List[Item]:
         entries = self.client.get_feed_entries(
             int(fid),
             order='id',
             direction='desc'
         )
-        return list(map(entry_dict_to_item, entries['entries']))
+        return self._apply_pending_reads([entry_dict_to_item(entry, max_media) for entry in entries['entries']])
 
     def get_feed(self, fid: str) -> Feed:
         return _feed_dict_to_feed(self.client.get_feed(int(fid)))
 
+    def find_feed_by_fid(self, fid: str) -> Feed:
+        # a stale index is rebuilt with one listing rather than asking for every feed on its own
+        feed = self._get_feed_index().get(fid)
+        if feed:
+            return feed
+        return self.get_feed(fid)
+
+    def find_feed_by_url(self, finding_url: str) -> Optional[Feed]:
+        return self._get_feed_index().find_by_url(finding_url)
+
     def update_feed_group(self, fid: str, gid: str):
         self.client.update_feed(int(fid), category_id=int(gid))
+        self.counters.invalidate()
+        self.feed_index.move(fid, gid)
 
     def add_feed(self, feed_url: str, gid: str) -> Optional[str]:
         try:
@@ -183,12 +271,25 @@ class MinifluxAggregator(RssAggregator):
             if e.get_error_reason() == "parser: unable to detect feed format":
                 return None
             raise e
-        return str(fid)
+        fid = str(fid)
+        if self.feed_index.is_fresh():
+            self.feed_index.put(self.get_feed(fid))
+        return fid
 
     def delete_feed(self, fid: str):
         self.client.delete_feed(int(fid))
+        self.counters.invalidate()
+        self.feed_index.remove(fid)
+
+    def enable_feed(self, fid: str):
+        self.client.update_feed(int(fid), disabled=False)
+
+    def disable_feed(self, fid: str):
+        self.client.update_feed(int(fid), disabled=True)
 
     def mark_last_unread(self, count: int):
+        # queued reads must not land after, and undo, this
+        self.mark_read_queue.flush(force=True)
         entries = self.client.get_entries(
             order='id',
             direction='desc',
@@ -196,24 +297,28 @@ class MinifluxAggregator(RssAggregator):
         )
         entry_ids = [entry['id'] for entry in entries['entries']]
         self.client.update_entries(entry_ids, 'unread')
+        self.counters.invalidate()
 
     def get_item(self, iid: str) -> Item:
-        return entry_dict_to_item(self.client.get_entry(int(iid)))
+        item = self._apply_pending_reads([entry_dict_to_item(self.client.get_entry(int(iid)))])[0]
+        self.counters.remember_items([item])
+        return item
 
     def get_item_and_entry_dict(self, iid: str) -> tuple[Item, dict]:
         entry_dict = self.client.get_entry(int(iid))
-        item = entry_dict_to_item(entry_dict)
+        item = self._apply_pending_reads([entry_dict_to_item(entry_dict)])[0]
+        self.counters.remember_items([item])
         return item, entry_dict
 
     def get_feed_icon(self, fid: str) -> Optional[FeedIcon]:
         try:
             fi = self.client.get_feed_icon(int(fid))
-            return FeedIcon(
-                data=fi['data'],
-                mime_type=fi['mime_type']
-            )
-        except Exception:
+        except miniflux.ResourceNotFound:
             return None
+        return FeedIcon(
+            data=fi['data'],
+            mime_type=fi['mime_type']
+        )
 
     def create_group(self, title: str) -> str:
         return str(self.client.create_category(title)["id"])
@@ -224,9 +329,12 @@ class MinifluxAggregator(RssAggregator):
 
     def rename_group(self, gid: str, new_title: str):
         self.client.update_category(int(gid), new_title)
+        self.feed_index.invalidate()
 
     def delete_group(self, gid: str):
         self.client.delete_category(int(gid))
+        self.counters.invalidate()
+        self.feed_index.invalidate()
 
     def get_username(self) -> str:
         return self.client.me()['username']
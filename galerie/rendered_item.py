@@ -1,14 +1,12 @@
-import os
-import base64
 import datetime
 from typing import List, Optional
-from urllib.parse import unquote, urlparse
+from urllib.parse import unquote
 from dataclasses import dataclass, field
-from bs4 import BeautifulSoup
 from .item import Item
 from .group import Group
 from .media_proxy import sign_media_url
-from .twitter import get_nitter_base_url, fix_shareable_twitter_url, TWITTER_VIDEO_CDN_URL, TWITTER_MEDIA_CDN_URL
+from .twitter import fix_shareable_twitter_url
+from .url_rewriter import get_url_rewriter, TWITTER_VIDEO_CDN_URL
 
 
 @dataclass
@@ -38,31 +36,11 @@ class RenderedItem:
 
 
 def get_media_proxy_custom_url() -> str:
-    url = os.environ.get('MEDIA_PROXY_CUSTOM_URL', '')
-    if not url.endswith('/'):
-        url += '/'
-    return url
+    return get_url_rewriter().media_proxy_custom_url
 
 
 def fix_proxied_media_url(url: str) -> str:
-    media_proxy_custom_url = get_media_proxy_custom_url()
-
-    if url.startswith(media_proxy_custom_url):
-        # if starts with http://galerie-reader-media and looks like http://galerie-reader-media/<some base64>
-        encoded_url = url[len(media_proxy_custom_url):]
-        decoded_url = base64.urlsafe_b64decode(encoded_url).decode('utf-8')
-
-        if decoded_url.startswith(get_nitter_base_url()):
-            # if <some base64> starts with http://nitter and looks like http://nitter/pic/<some urlencoded>
-            twitter_media_path = unquote(urlparse(decoded_url).path.split('/')[-1])
-
-            # decode <some urlencoded> and get final url, e.g. https://pbs.twimg.com/media/<some jpg>
-            return TWITTER_MEDIA_CDN_URL + twitter_media_path
-
-        return decoded_url
-
-    # notice that nitter actually returns the real link for twitter videos, so twitter video links are actually not fixed here
-    return url
+    return get_url_rewriter().fix_proxied_media_url(url)
 
 
 def proxy_twitter_video_url(url: str) -> str:
@@ -73,35 +51,21 @@ def proxy_twitter_video_url(url: str) -> str:
 
 
 def convert_rendered_item(item: Item, max_rendered_items: int, ignore_rendered_items_cap: Optional[bool]=False) -> List[RenderedItem]:
-    soup = BeautifulSoup(item.html, 'html.parser')
-    
-    target_elements = []
-    image_count, video_count = 0, 0
-    for target_element in soup.find_all(['img', 'video']):
-        if target_element.name == 'img':
-            image_count += 1
-        elif target_element.name == 'video':
-            source_element = target_element.find('source')
-            if not source_element or not source_element.get('src'):
-                continue
-            video_count += 1
-        target_elements.append(target_element)
-
+    media = item.media
     if not ignore_rendered_items_cap:
-        target_elements = target_elements[:max_rendered_items]
+        media = media[:max_rendered_items]
 
     res = []
-    for i, target_element in enumerate(target_elements):
-        if target_element.name == 'img':
-            image_url = target_element.get('src', '')
+    for i, medium in enumerate(media):
+        if medium.kind == 'image':
+            image_url = medium.src
             video_url = ''
             video_thumbnail_url = ''
 
-        elif target_element.name == 'video':
+        elif medium.kind == 'video':
             image_url = ''
-            source_element = target_element.find('source')
-            video_url = source_element.get('src', '') if source_element else target_element.get('src', '')
-            video_thumbnail_url = target_element.get('poster', '')
+            video_url = medium.src
+            video_thumbnail_url = medium.poster
 
         video_url = fix_proxied_media_url(video_url)
         video_url = proxy_twitter_video_url(video_url)
@@ -121,8 +85,8 @@ def convert_rendered_item(item: Item, max_rendered_items: int, ignore_rendered_i
             video_url=video_url,
             video_thumbnail_url=fix_proxied_media_url(video_thumbnail_url),
             text=item.text if item.text else "(No text)",
-            video_count=video_count,
-            image_count=image_count,))
+            video_count=item.video_count,
+            image_count=item.image_count,))
 
     return res
 
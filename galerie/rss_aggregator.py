@@ -5,6 +5,7 @@ from .item import Item
 from .group import Group
 from .feed import Feed
 from .feed_icon import FeedIcon
+from .bulk_feed_ops import BulkFeedResult, run_bulk_feed_op
 from .twitter import extract_twitter_handle_from_url, extract_twitter_handle_from_url
 
 
@@ -20,11 +21,12 @@ class RssAggregator(ABC):
         pass
 
     @abstractmethod
-    def get_items(self, count: int, from_iid_exclusive: Optional[str], group_id: Optional[str], sort_by_id_descending: bool, include_read: bool) -> List[Item]:
+    def get_items(self, count: int, from_iid_exclusive: Optional[str], group_id: Optional[str], sort_by_id_descending: bool, include_read: bool, max_media: Optional[int] = None) -> List[Item]:
+        """`max_media` caps the media kept on each item, their counts stay exact."""
         pass
     
     @abstractmethod
-    def get_unread_items_count_by_group_ids(self, gids: List[str]) -> Dict[str, int]:
+    def get_unread_items_count_by_group_ids(self, gids: List[str], include_read: bool) -> Dict[str, int]:
         pass
 
     @abstractmethod
@@ -48,7 +50,7 @@ class RssAggregator(ABC):
         pass
 
     @abstractmethod
-    def get_feed_items_by_iid_descending(self, fid: str) -> List[Item]:
+    def get_feed_items_by_iid_descending(self, fid: str, max_media: Optional[int] = None) -> List[Item]:
         pass
     
     @abstractmethod
@@ -67,6 +69,14 @@ class RssAggregator(ABC):
     def delete_feed(self, fid: str):
         pass
 
+    @abstractmethod
+    def enable_feed(self, fid: str):
+        pass
+
+    @abstractmethod
+    def disable_feed(self, fid: str):
+        pass
+
     @abstractmethod
     def mark_last_unread(self, count: int):
         pass
@@ -99,9 +109,17 @@ class RssAggregator(ABC):
     def get_username(self) -> str:
         pass
 
-    def delete_feeds_by_group_id(self, gid: str):
-        for feed in self.get_feeds_by_group_id(gid):
-            self.delete_feed(feed.fid)
+    def delete_feeds(self, fids: List[str]) -> BulkFeedResult:
+        return run_bulk_feed_op(fids, self.delete_feed)
+
+    def move_feeds(self, fids: List[str], gid: str) -> BulkFeedResult:
+        return run_bulk_feed_op(fids, lambda fid: self.update_feed_group(fid, gid))
+
+    def set_feeds_enabled(self, fids: List[str], enabled: bool) -> BulkFeedResult:
+        return run_bulk_feed_op(fids, self.enable_feed if enabled else self.disable_feed)
+
+    def delete_feeds_by_group_id(self, gid: str) -> BulkFeedResult:
+        return self.delete_feeds([feed.fid for feed in self.get_feeds_by_group_id(gid)])
 
     def get_group(self, gid: str) -> Optional[Group]:
         for group in self.get_groups():
@@ -109,6 +127,10 @@ class RssAggregator(ABC):
                 return group
         return None
 
+    def find_feed_by_fid(self, fid: str) -> Feed:
+        """Like get_feed, but may answer from data the aggregator already has instead of asking upstream."""
+        return self.get_feed(fid)
+
     def find_feed_by_url(self, finding_url: str) -> Optional[Feed]:
         finding_twitter_handle = extract_twitter_handle_from_url(finding_url)
 
@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class TtlCache(Generic[K, V]):
+    """Thread-safe LRU cache whose entries expire after `ttl_seconds`, counted from the last `get` if `sliding`."""
+
+    def __init__(self, ttl_seconds: float, max_size: int, sliding: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.sliding = sliding
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            if self.sliding:
+                self._entries[key] = (now + self.ttl_seconds, value)
+            return value
+
+    def set(self, key: K, value: V, ttl_seconds: Optional[float] = None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            now = time.monotonic()
+            self._entries[key] = (now + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            # least recently used entries sit at the front, drop them while they are stale or over the cap
+            while self._entries:
+                oldest_expires_at, _ = next(iter(self._entries.values()))
+                if oldest_expires_at > now and len(self._entries) <= self.max_size:
+                    break
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def pop_where(self, predicate: Callable[[K, V], bool]) -> int:
+        with self._lock:
+            keys = [k for k, (_, v) in self._entries.items() if predicate(k, v)]
+            for k in keys:
+                del self._entries[k]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -3,27 +3,22 @@ import re
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from .url_rewriter import get_url_rewriter, twitter_domains
 
 
-TWITTER_VIDEO_CDN_URL = "https://video.twimg.com/"
-TWITTER_MEDIA_CDN_URL = "https://pbs.twimg.com/"
+NITTER_PROBE_TIMEOUT_SECONDS = 5
 
 
 def get_nitter_base_url():
-    if 'NITTER_BASE_URL' not in os.environ:
-        raise ValueError("NITTER_BASE_URL environment variable is not set.")
-    nitter_base_url = os.environ['NITTER_BASE_URL']
-    if nitter_base_url.endswith('/'):
-        nitter_base_url = nitter_base_url[:-1]
-    return nitter_base_url
+    return get_url_rewriter().nitter_base_url
 
 
 def is_nitter_url(url: str) -> bool:
-    return url.startswith(get_nitter_base_url())
+    return get_url_rewriter().is_nitter_url(url)
 
 
 def fix_nitter_url(url: str) -> str:
-    return url.replace(get_nitter_base_url(), "https://twitter.com")
+    return get_url_rewriter().fix_nitter_url(url)
 
 
 nitter_rt_title_pattern = r'^RT(?: by)? @[\w\d_]+:(.*)'
@@ -38,9 +33,7 @@ def fix_nitter_rt_title(title: str) -> str:
 
 
 def fix_nitter_urls_in_text(text: str) -> str:
-    nitter_base_url = get_nitter_base_url()
-    nitter_hostname = urlparse(nitter_base_url).netloc
-    return text.replace(nitter_hostname, "twitter.com")
+    return get_url_rewriter().fix_nitter_urls_in_text(text)
 
 
 nitter_rt_text_pattern = r'RT @[\w\d_]+ :\s*(.*)'
@@ -73,25 +66,16 @@ def extract_twitter_handle_from_nitter_feed_url(feed_url: str) -> str | None:
     return path.split('/rss')[0]
 
 
-twitter_domains = {
-    "twitter.com",
-    "mobile.twitter.com",
-    "x.com",
-    "mobile.x.com",
-    "fxtwitter.com",
-    "fixupx.com"
-}
-
-
 def extract_twitter_handle_from_url(url: str) -> str | None:
     nitter_base_url = get_nitter_base_url()
     if url.startswith(nitter_base_url):
         return url[len(nitter_base_url):].split('/')[1].lower()
 
-    if urlparse(url).netloc not in twitter_domains:
+    parsed_url = urlparse(url)
+    if parsed_url.netloc not in twitter_domains:
         return None
     
-    path = urlparse(url).path
+    path = parsed_url.path
     if path.startswith('/'):
         path = path[1:]
     
@@ -102,17 +86,12 @@ def extract_twitter_handle_from_url(url: str) -> str | None:
 
 
 def fix_shareable_twitter_url(url: str) -> str:
-    for domain in twitter_domains:
-        if url.startswith(f'http://{domain}'):
-            return url.replace(f'http://{domain}', 'https://fxtwitter.com')
-        elif url.startswith(f'https://{domain}'):
-            return url.replace(f'https://{domain}', 'https://fxtwitter.com')
-    return url
+    return get_url_rewriter().fix_shareable_twitter_url(url)
 
 
 def check_twitter_handle_status(twitter_handle: str) -> str:
     nitter_url = f'{get_nitter_base_url()}/{twitter_handle}'
-    resp = str(requests.get(nitter_url).content)
+    resp = str(requests.get(nitter_url, timeout=NITTER_PROBE_TIMEOUT_SECONDS).content)
     if twitter_handle not in resp:
         return ''
     if 'not found' in resp:
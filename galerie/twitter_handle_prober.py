@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Optional
+from sentry_sdk import capture_exception
+from .ttl_cache import TtlCache
+from .twitter import check_twitter_handle_status
+
+
+HANDLE_STATUS_TTL_SECONDS = 6 * 60 * 60
+# a failed probe is retried after this long rather than after HANDLE_STATUS_TTL_SECONDS
+HANDLE_STATUS_FAILURE_TTL_SECONDS = 5 * 60
+HANDLE_STATUS_MAX_SIZE = 20000
+HANDLE_PROBE_MAX_WORKERS = 8
+
+
+class TwitterHandleProber(object):
+    """Checks X/Twitter account statuses on Nitter in the background and remembers them for all users."""
+
+    def __init__(self):
+        self._statuses: TtlCache[str, str] = TtlCache(
+            ttl_seconds=HANDLE_STATUS_TTL_SECONDS,
+            max_size=HANDLE_STATUS_MAX_SIZE,
+        )
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=HANDLE_PROBE_MAX_WORKERS, thread_name_prefix='nitter-probe')
+
+    def cached(self, handle: str) -> Optional[str]:
+        """The remembered status of `handle`, None if it has to be probed first."""
+        return self._statuses.get(handle)
+
+    def probe(self, handles: Iterable[str]) -> Dict[str, Future]:
+        """Start probing the handles whose status isn't known yet, returning the probes of all of them."""
+        futures = {}
+        with self._lock:
+            for handle in set(handles):
+                if self._statuses.get(handle) is not None:
+                    continue
+                future = self._in_flight.get(handle)
+                if future is None:
+                    future = self._executor.submit(self._probe, handle)
+                    self._in_flight[handle] = future
+                futures[handle] = future
+        return futures
+
+    def wait(self, handles: Iterable[str], timeout: float) -> Dict[str, str]:
+        """The statuses of the handles known after waiting up to `timeout` seconds for the ones being probed."""
+        handles = set(handles)
+        futures = self.probe(handles)
+        if futures:
+            wait(futures.values(), timeout=timeout)
+        statuses = {}
+        for handle in handles:
+            status = self._statuses.get(handle)
+            if status is not None:
+                statuses[handle] = status
+        return statuses
+
+    def _probe(self, handle: str):
+        try:
+            self._statuses.set(handle, check_twitter_handle_status(handle))
+        except Exception as e:
+            capture_exception(e)
+            self._statuses.set(handle, '', ttl_seconds=HANDLE_STATUS_FAILURE_TTL_SECONDS)
+        finally:
+            with self._lock:
+                self._in_flight.pop(handle, None)
+
+
+twitter_handle_prober = TwitterHandleProber()
@@ -0,0 +1,91 @@
+import os
+import re
+import base64
+import functools
+from urllib.parse import unquote, urlparse
+
+
+TWITTER_VIDEO_CDN_URL = "https://video.twimg.com/"
+TWITTER_MEDIA_CDN_URL = "https://pbs.twimg.com/"
+
+twitter_domains = {
+    "twitter.com",
+    "mobile.twitter.com",
+    "x.com",
+    "mobile.x.com",
+    "fxtwitter.com",
+    "fixupx.com"
+}
+
+REWRITTEN_URLS_MEMO_MAX_SIZE = 8192
+
+
+class UrlRewriter(object):
+    """Rewrites Nitter, Twitter and media proxy URLs, with the configuration read once and rewrites memoized."""
+
+    def __init__(self, nitter_base_url: str, media_proxy_custom_url: str):
+        if nitter_base_url.endswith('/'):
+            nitter_base_url = nitter_base_url[:-1]
+        self.nitter_base_url = nitter_base_url
+        self.nitter_hostname = urlparse(nitter_base_url).netloc
+
+        if not media_proxy_custom_url.endswith('/'):
+            media_proxy_custom_url += '/'
+        self.media_proxy_custom_url = media_proxy_custom_url
+
+        # longest domains first so that e.g. mobile.x.com is never cut short
+        domains = sorted(twitter_domains, key=len, reverse=True)
+        self._shareable_prefix_pattern = re.compile(
+            r'^https?://(?:' + '|'.join(re.escape(domain) for domain in domains) + ')')
+
+        self.fix_proxied_media_url = functools.lru_cache(maxsize=REWRITTEN_URLS_MEMO_MAX_SIZE)(
+            self._fix_proxied_media_url)
+        self.fix_shareable_twitter_url = functools.lru_cache(maxsize=REWRITTEN_URLS_MEMO_MAX_SIZE)(
+            self._fix_shareable_twitter_url)
+
+    def is_nitter_url(self, url: str) -> bool:
+        return url.startswith(self.nitter_base_url)
+
+    def fix_nitter_url(self, url: str) -> str:
+        return url.replace(self.nitter_base_url, "https://twitter.com")
+
+    def fix_nitter_urls_in_text(self, text: str) -> str:
+        return text.replace(self.nitter_hostname, "twitter.com")
+
+    def _fix_shareable_twitter_url(self, url: str) -> str:
+        match = self._shareable_prefix_pattern.match(url)
+        if not match:
+            return url
+        return url.replace(match.group(0), 'https://fxtwitter.com')
+
+    def _fix_proxied_media_url(self, url: str) -> str:
+        if not url.startswith(self.media_proxy_custom_url):
+            # notice that nitter actually returns the real link for twitter videos, so twitter video links are actually not fixed here
+            return url
+
+        # if starts with http://galerie-reader-media and looks like http://galerie-reader-media/<some base64>
+        encoded_url = url[len(self.media_proxy_custom_url):]
+        decoded_url = base64.urlsafe_b64decode(encoded_url).decode('utf-8')
+
+        if decoded_url.startswith(self.nitter_base_url):
+            # if <some base64> starts with http://nitter and looks like http://nitter/pic/<some urlencoded>
+            twitter_media_path = unquote(urlparse(decoded_url).path.split('/')[-1])
+
+            # decode <some urlencoded> and get final url, e.g. https://pbs.twimg.com/media/<some jpg>
+            return TWITTER_MEDIA_CDN_URL + twitter_media_path
+
+        return decoded_url
+
+
+_url_rewriter = None
+
+
+def get_url_rewriter() -> UrlRewriter:
+    """The rewriter for the current configuration, built on first use and shared by the whole process."""
+    global _url_rewriter
+    if _url_rewriter is None:
+        if 'NITTER_BASE_URL' not in os.environ:
+            raise ValueError("NITTER_BASE_URL environment variable is not set.")
+        # two threads racing here build equal rewriters, keeping either one is fine
+        _url_rewriter = UrlRewriter(os.environ['NITTER_BASE_URL'], os.environ.get('MEDIA_PROXY_CUSTOM_URL', ''))
+    return _url_rewriter
@@ -1,61 +1,102 @@
-import os
 import io
-import requests
+import time
 import tempfile
-import zipfile
-from flask import request, Blueprint, g, send_file, after_this_request
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Iterator, Tuple
+from urllib.parse import quote
+from flask import request, Blueprint, Response, g
+from sentry_sdk import capture_exception
 from galerie.rendered_item import convert_rendered_item
 from galerie_flask.actions_blueprint import make_toast
 from galerie_flask.utils import requires_auth, DEFAULT_MAX_RENDERED_ITEMS
+from galerie_flask.media_streaming import open_upstream, iter_upstream, passthrough_response
+from galerie_flask.zip_stream import stream_zip
 
 
-download_media_bp = Blueprint('download_media', __name__)
-
+DOWNLOAD_MAX_WORKERS = 6
+DOWNLOAD_FILE_TIMEOUT_SECONDS = 20
+# files bigger than this are spooled to a temp file while they wait for their turn in the archive
+DOWNLOAD_SPOOL_MAX_MEMORY_BYTES = 8 * 1024 ** 2
 
-def _download_media(urls: list[str], iid: str):
-    if len(urls) == 1:
-        url = urls[0]
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+# bounds concurrent fetches across all downloads of a worker
+_download_executor = ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_WORKERS, thread_name_prefix='download-media')
 
-        file_data = io.BytesIO(response.content)
-        file_data.seek(0)
 
-        filename = url.split('/')[-1].split('?')[0]
+download_media_bp = Blueprint('download_media', __name__)
 
-        return send_file(
-            file_data,
-            mimetype=content_type,
-            as_attachment=True,
-            download_name=filename
-        )
 
-    temp_zip = tempfile.NamedTemporaryFile(delete=True, suffix='.zip')
+def _download_single_media(url: str):
+    # relayed chunk by chunk, so a large video never sits in worker memory; Range lets downloads resume
+    upstream = open_upstream(url, request.headers.get('Range'))
+    resp = passthrough_response(upstream)
+    if 'Content-Type' not in resp.headers:
+        resp.mimetype = 'application/octet-stream'
+    filename = url.split('/')[-1].split('?')[0]
     try:
-        with zipfile.ZipFile(temp_zip.name, 'w') as zipf:
-            for url in urls:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
+        resp.headers.set('Content-Disposition', 'attachment', filename=filename.encode('ascii').decode())
+    except UnicodeEncodeError:
+        # the same fallback send_file uses for names that aren't plain ascii
+        resp.headers.set('Content-Disposition', 'attachment', filename=filename.encode('ascii', 'ignore').decode(),
+                         **{'filename*': f"UTF-8''{quote(filename, safe='')}"})
+    return resp
+
 
+def _fetch_to_spool(url: str) -> Tuple[BinaryIO, int]:
+    deadline = time.monotonic() + DOWNLOAD_FILE_TIMEOUT_SECONDS
+    spool = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_MEMORY_BYTES)
+    try:
+        for chunk in iter_upstream(open_upstream(url)):
+            spool.write(chunk)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Downloading {url} took longer than {DOWNLOAD_FILE_TIMEOUT_SECONDS}s")
+        size = spool.tell()
+        spool.seek(0)
+        return spool, size
+    except BaseException:
+        spool.close()
+        raise
+
+
+def _stream_media_zip(urls: list[str]) -> Iterator[bytes]:
+    # every file is requested right away, the archive is written in order as they arrive
+    futures = [_download_executor.submit(_fetch_to_spool, url) for url in urls]
+    failed = []
+    try:
+        def members():
+            for url, future in zip(urls, futures):
                 filename = url.split('/')[-1].split('?')[0]
-                    
-                zipf.writestr(filename, response.content)
-        
-        # Send the zip file
-        return send_file(
-            temp_zip.name,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=f"media_{iid}.zip"
-        )
+                try:
+                    spool, size = future.result()
+                except Exception as e:
+                    capture_exception(e)
+                    failed.append(url)
+                    continue
+                with spool:
+                    yield filename, spool, size
+            if failed:
+                # the archive is already on its way, so failures can only be reported inside it
+                report = '\n'.join(failed).encode() + b'\n'
+                yield 'failed_downloads.txt', io.BytesIO(report), len(report)
+        yield from stream_zip(members())
     finally:
-        # Clean up temp file (after response is sent)
-        @after_this_request
-        def _remove_file(response):
-            if os.path.exists(temp_zip.name):
-                os.unlink(temp_zip.name)
-            return response
+        # on a finished or aborted download, stop what hasn't started and drop whatever was or will be fetched
+        for future in futures:
+            if not future.cancel():
+                future.add_done_callback(_close_spool)
+
+
+def _close_spool(future: Future):
+    if future.exception() is None:
+        future.result()[0].close()
+
+
+def _download_media(urls: list[str], iid: str):
+    if len(urls) == 1:
+        return _download_single_media(urls[0])
+
+    resp = Response(_stream_media_zip(urls), mimetype='application/zip')
+    resp.headers.set('Content-Disposition', 'attachment', filename=f"media_{iid}.zip")
+    return resp
 
 
 @download_media_bp.route('/download_media')
@@ -1,6 +1,5 @@
 import json
 from flask import request, g, Blueprint, make_response, render_template
-from galerie.rendered_item import convert_rendered_items
 from galerie_flask.utils import (
     requires_auth,
     load_more_button_args,
@@ -10,6 +9,7 @@ from galerie_flask.utils import (
     compute_read_percentage,
 )
 from galerie_flask.actions_blueprint import catches_exceptions
+from galerie_flask.prefetch import next_page_prefetcher
 
 
 load_more_bp = Blueprint('load_more', __name__, template_folder='../../shared_templates')
@@ -33,15 +33,8 @@ def load_more():
     total_count = int(request.args.get('total_count'))
     read_percentage = compute_read_percentage(remaining_count, total_count)
 
-    unread_items = g.aggregator.get_items(
-        count=max_items,
-        from_iid_exclusive=from_iid,
-        group_id=gid,
-        sort_by_id_descending=sort_by_desc,
-        include_read=include_read
-    )
-
-    rendered_items, iids_without_media = convert_rendered_items(unread_items, max_rendered_items)
+    unread_items, rendered_items, iids_without_media = next_page_prefetcher.get_page(
+        g.aggregator, max_items, from_iid, gid, sort_by_desc, include_read, max_rendered_items)
     last_iid = unread_items[-1].iid if unread_items else ''
 
     marked_as_read_iids = []
@@ -49,8 +42,12 @@ def load_more():
         iids = request.form.getlist('iid')
         if iids:
             g.aggregator.mark_items_as_read(iids)
+            next_page_prefetcher.invalidate(g.aggregator, iids)
             marked_as_read_iids = iids
 
+    # the load more button scrolls into view right away on a fast reader, have its page ready by then
+    next_page_prefetcher.schedule(g.aggregator, max_items, last_iid, gid, sort_by_desc, include_read, max_rendered_items)
+
     if last_iid:
         args = {"scroll_as_read": scroll_as_read}
         items_args(args, rendered_items, True, gid is None, no_text_mode, iids_without_media)
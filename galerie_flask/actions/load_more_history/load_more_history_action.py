@@ -4,7 +4,8 @@ from galerie.rendered_item import convert_rendered_item
 from galerie.miniflux_aggregator import entry_dict_to_item
 from galerie_flask.utils import requires_auth, load_more_button_args, items_args, DEFAULT_MAX_ITEMS, DEFAULT_MAX_RENDERED_ITEMS, compute_read_percentage
 from galerie_flask.actions_blueprint import catches_exceptions
-from galerie_flask.db import ItemViewHistory, Session, db
+from galerie_flask.history_cursor import decode_cursor, get_history_page
+from galerie_flask.entry_store import load_entry_dicts
 
 
 load_more_history_bp = Blueprint('load_more_history', __name__, template_folder='../../shared_templates')
@@ -19,37 +20,30 @@ def load_more_history():
     max_rendered_items = int(request.cookies.get('max_rendered_items', DEFAULT_MAX_RENDERED_ITEMS))
     no_text_mode = request.cookies.get('no_text_mode', '0') == '1'
 
-    from_uuid = request.args.get('from_iid')  # Using from_iid param name for consistency
+    cursor = decode_cursor(request.args.get('from_iid', ''))  # Using from_iid param name for consistency
     remaining_count = int(request.args.get('remaining_count'))
     total_count = int(request.args.get('total_count'))
     read_percentage = compute_read_percentage(remaining_count, total_count)
 
-    # Get user_uuid from session
-    session_token = request.cookies.get('session_token')
-    session = db.session.query(Session).filter_by(uuid=session_token).first()
-    user_uuid = session.user_uuid
+    user_uuid = g.user_session.user_uuid
 
-    # Get the timestamp of the last loaded item to continue pagination
-    last_item = db.session.query(ItemViewHistory).filter_by(uuid=from_uuid).first()
-    if not last_item:
-        # If we can't find the item, return empty result
+    if cursor is None:
+        # If the cursor is malformed, return empty result
         args = {}
         rendered_string = render_template('all_loaded_marker.html', **args)
         resp = make_response(rendered_string)
         return resp
 
-    # Query next batch of history items after the last timestamp
-    view_history = db.session.query(ItemViewHistory).filter(
-        ItemViewHistory.user_uuid == user_uuid,
-        ItemViewHistory.created_at < last_item.created_at
-    ).order_by(ItemViewHistory.created_at.desc()).limit(max_items).all()
+    # Query next batch of history items after the cursor
+    view_history, next_cursor = get_history_page(user_uuid, max_items, after=cursor)
 
     items = []
     item_indices = []  # Store the index for each item
+    entry_dicts = load_entry_dicts(view_history)
     for history_entry in view_history:
         try:
-            if history_entry.miniflux_entry:
-                item = entry_dict_to_item(history_entry.miniflux_entry)
+            if history_entry.uuid in entry_dicts:
+                item = entry_dict_to_item(entry_dicts[history_entry.uuid])
                 # Extract the index from item_uid (format: "iid-index")
                 index = int(history_entry.item_uid.split('-')[1])
                 items.append(item)
@@ -67,15 +61,13 @@ def load_more_history():
             # Fallback to first item if index is out of bounds
             rendered_items.append(all_rendered[0])
 
-    last_uuid = view_history[-1].uuid if view_history else ''
-
-    if last_uuid:
+    if next_cursor:
         args = {}
         items_args(args, rendered_items, False, False, no_text_mode, [])
         remaining_count = remaining_count - max_items if remaining_count > max_items else 0
         load_more_button_args(
             args=args,
-            from_iid=last_uuid,
+            from_iid=next_cursor,
             gid=None,
             sort_by_desc=True,
             infinite_scroll=infinite_scroll,
@@ -1,6 +1,7 @@
 from flask import g, Blueprint, make_response
 from flask_babel import _
 from galerie_flask.actions_blueprint import catches_exceptions, requires_auth, make_toast
+from galerie_flask.prefetch import next_page_prefetcher
 
 
 mark_all_as_read_bp = Blueprint('mark_all_as_read', __name__)
@@ -11,6 +12,7 @@ mark_all_as_read_bp = Blueprint('mark_all_as_read', __name__)
 @requires_auth
 def mark_all_as_read():
     g.aggregator.mark_all_items_as_read()
+    next_page_prefetcher.invalidate(g.aggregator)
 
     resp = make_response()
     resp.headers['HX-Refresh'] = "true"
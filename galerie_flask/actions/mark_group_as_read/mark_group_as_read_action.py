@@ -1,6 +1,7 @@
 from flask import request, g, Blueprint, make_response
 from flask_babel import _
 from galerie_flask.actions_blueprint import catches_exceptions, requires_auth, make_toast
+from galerie_flask.prefetch import next_page_prefetcher
 
 
 mark_group_as_read_bp = Blueprint('mark_group_as_read', __name__)
@@ -15,6 +16,7 @@ def mark_group_as_read():
         return make_toast(400, _("Group is required"))
 
     g.aggregator.mark_all_group_items_as_read(group)
+    next_page_prefetcher.invalidate(g.aggregator)
 
     resp = make_response()
     resp.headers['HX-Refresh'] = "true"
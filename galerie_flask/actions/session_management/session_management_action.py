@@ -3,6 +3,7 @@ from flask_babel import _
 from galerie_flask.actions_blueprint import make_toast
 from galerie_flask.utils import requires_auth
 from galerie_flask.db import db, Session
+from galerie_flask.miniflux_admin import forget_user_sessions
 
 
 session_management_bp = Blueprint('session_management_action', __name__)
@@ -46,6 +47,7 @@ def terminate_all_other_sessions():
         Session.uuid != session_token
     ).delete()
     db.session.commit()
+    forget_user_sessions(current_session.user_uuid, session_token)
 
     return make_toast(200, _("Terminated {} other session(s)").format(deleted_count))
 
@@ -68,5 +70,6 @@ def terminate_all_other_unnamed_sessions():
         Session.name == ""
     ).delete()
     db.session.commit()
+    forget_user_sessions(current_session.user_uuid, session_token)
 
     return make_toast(200, _("Terminated {} unnamed session(s)").format(deleted_count))
@@ -2,12 +2,14 @@ import os
 import json
 from typing import Dict
 from functools import wraps
-from flask import request, g, Blueprint, make_response, Response
+from flask import request, g, Blueprint, make_response, Response, jsonify
 from flask_babel import _
 from sentry_sdk import capture_exception
 from .utils import requires_auth, cookie_max_age
 from .get_aggregator import get_aggregator
 from .miniflux_admin import get_miniflux_admin, MinifluxAdminException
+from .prefetch import next_page_prefetcher
+from .jobs import job_runner, jobs_enabled, current_job_owner, get_job, refresh_dead_feeds
 
 
 actions_blueprint = Blueprint('actions_legacy', __name__)
@@ -202,33 +204,64 @@ def delete_group():
 @requires_auth
 @catches_exceptions
 def refresh_all_dead_feeds():
-    total_count = 0
-    success_count = 0
-
-    for feed in g.aggregator.client.get_feeds():
-        if feed.get("parsing_error_count", 0) == 0:
-            continue
-
-        try:
-            g.aggregator.client.refresh_feed(feed["id"])
-            success_count += 1
-        except Exception as e:
-            pass
-        total_count += 1
+    if not jobs_enabled():
+        # without a database there is nowhere to keep the progress, refresh within the request
+        for feed in g.aggregator.client.get_feeds():
+            if feed.get("parsing_error_count", 0) == 0:
+                continue
+            try:
+                g.aggregator.client.refresh_feed(feed["id"])
+            except Exception:
+                pass
+        g.aggregator.invalidate_feeds()
+
+        resp = make_response()
+        resp.headers['HX-Refresh'] = "true"
+        return resp
+
+    job_uuid = job_runner.start(current_job_owner(), 'refresh_dead_feeds', refresh_dead_feeds(g.aggregator))
 
     resp = make_response()
-    resp.headers['HX-Refresh'] = "true"
+    make_hx_trigger_header(resp, {
+        "job_started": job_uuid
+    })
     return resp
 
 
+@actions_blueprint.route('/job_status')
+@requires_auth
+@catches_exceptions
+def job_status():
+    job = get_job(current_job_owner(), request.args.get('job', ''))
+    if job is None:
+        return make_toast(404, "Job not found")
+
+    status = {
+        "status": job.status,
+        "total": job.total,
+        "succeeded": job.succeeded,
+        "failed": job.failed,
+    }
+    if job.status == 'succeeded':
+        status["message"] = str(_("Refreshed %(succeeded)s dead feeds, %(failed)s failed",
+                                  succeeded=job.succeeded, failed=job.failed))
+    elif job.status == 'failed':
+        status["message"] = str(_("Refreshing dead feeds failed"))
+    return jsonify(status)
+
+
 @actions_blueprint.route('/delete_feeds', methods=['POST'])
 @requires_auth
 @catches_exceptions
 def delete_feeds():
-    for item in request.form:
-        if item.startswith('dead-feed-'):
-            fid = item[len("dead-feed-"):]
-            g.aggregator.delete_feed(fid)
+    fids = [item[len("dead-feed-"):] for item in request.form if item.startswith('dead-feed-')]
+    result = g.aggregator.delete_feeds(fids)
+    if result.failed:
+        # the feeds that were deleted still have to leave the list
+        resp = make_toast(200, str(_("Deleted %(deleted)s feeds, failed to delete %(failed)s",
+                                     deleted=len(result.succeeded), failed=len(result.failed))))
+        resp.headers['HX-Refresh'] = "true"
+        return resp
 
     resp = make_response()
     resp.headers['HX-Refresh'] = "true"
@@ -259,4 +292,5 @@ def mark_last_unread():
 
     count = int(request.args.get('count'))
     g.aggregator.mark_last_unread(count)
+    next_page_prefetcher.invalidate(g.aggregator)
     return make_toast(200, f"Marked last {count} items as unread")
@@ -1,3 +1,4 @@
+from typing import Optional
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -17,6 +18,8 @@ class User(db.Model):
     miniflux_password: Mapped[str]
     feed_limit: Mapped[int]
     history_limit: Mapped[int]
+    # number of item_view_history rows, kept up to date by the history recorder and trimming instead of counted
+    history_count: Mapped[int] = mapped_column(default=0, server_default='0')
     created_at: Mapped[str] = mapped_column(db.DateTime, server_default=db.func.now())
 
 
@@ -29,6 +32,11 @@ class Session(db.Model):
     created_at: Mapped[str] = mapped_column(db.DateTime, server_default=db.func.now())
     accessed_at: Mapped[str] = mapped_column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('ix_sessions_user_uuid', 'user_uuid'),
+        db.Index('ix_sessions_created_at', 'created_at'),
+    )
+
 
 class InstapaperConnection(db.Model):
     __tablename__ = 'instapaper_connections'
@@ -44,5 +52,57 @@ class ItemViewHistory(db.Model):
     uuid: Mapped[str] = mapped_column(primary_key=True)
     user_uuid: Mapped[str] = mapped_column(db.ForeignKey('users.uuid'))
     item_uid: Mapped[str]
-    miniflux_entry: Mapped[dict] = mapped_column(db.JSON)
+    # legacy rows carry the whole entry, newer ones point into history_entries
+    miniflux_entry: Mapped[Optional[dict]] = mapped_column(db.JSON)
+    entry_id: Mapped[Optional[str]]
+    entry_hash: Mapped[Optional[str]]
+    created_at: Mapped[str] = mapped_column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_item_view_history_user_uuid_created_at_uuid', 'user_uuid', 'created_at', 'uuid'),
+        db.Index('ix_item_view_history_entry_id_entry_hash', 'entry_id', 'entry_hash'),
+    )
+
+
+class HistoryEntry(db.Model):
+    __tablename__ = 'history_entries'
+    entry_id: Mapped[str] = mapped_column(primary_key=True)
+    content_hash: Mapped[str] = mapped_column(primary_key=True)
+    # zlib-compressed JSON of the trimmed entry, shared by every view of the same entry content
+    data: Mapped[bytes] = mapped_column(db.LargeBinary)
+    created_at: Mapped[str] = mapped_column(db.DateTime, server_default=db.func.now())
+
+
+class StoredFeedIcon(db.Model):
+    __tablename__ = 'feed_icons'
+    fid: Mapped[str] = mapped_column(primary_key=True)
+    # miniflux icon data ("<mime type>;base64,<payload>"), None when the feed has no icon
+    data: Mapped[Optional[str]] = mapped_column(db.Text)
+    mime_type: Mapped[Optional[str]]
+    fetched_at: Mapped[str] = mapped_column(db.DateTime, server_default=db.func.now())
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    uuid: Mapped[str] = mapped_column(primary_key=True)
+    # user uuid on managed instances, miniflux username on self-hosted ones
+    owner: Mapped[str]
+    kind: Mapped[str]
+    # queued, running, succeeded or failed
+    status: Mapped[str]
+    total: Mapped[int] = mapped_column(default=0)
+    succeeded: Mapped[int] = mapped_column(default=0)
+    failed: Mapped[int] = mapped_column(default=0)
+    error: Mapped[Optional[str]] = mapped_column(db.Text)
     created_at: Mapped[str] = mapped_column(db.DateTime, server_default=db.func.now())
+    updated_at: Mapped[str] = mapped_column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_jobs_owner_created_at', 'owner', 'created_at'),
+    )
+
+
+class HousekeepingRun(db.Model):
+    __tablename__ = 'housekeeping_runs'
+    name: Mapped[str] = mapped_column(primary_key=True)
+    last_run_at: Mapped[str] = mapped_column(db.DateTime)
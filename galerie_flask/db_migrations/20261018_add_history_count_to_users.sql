@@ -0,0 +1,11 @@
+-- Migration: Cached history counts
+-- Date: 2026-10-18
+-- Description: Adds users.history_count, kept up to date as views are recorded and trimmed. The count is
+-- recomputed here so existing users start out right.
+
+ALTER TABLE users
+ADD COLUMN IF NOT EXISTS history_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE users SET history_count = (
+    SELECT count(*) FROM item_view_history WHERE item_view_history.user_uuid = users.uuid
+);
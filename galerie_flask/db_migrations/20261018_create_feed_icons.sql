@@ -0,0 +1,10 @@
+-- Migration: Create feed icons
+-- Date: 2026-10-18
+-- Description: Feed icons fetched from miniflux, shared by all workers; data is NULL for feeds without an icon.
+
+CREATE TABLE IF NOT EXISTS feed_icons (
+    fid VARCHAR NOT NULL PRIMARY KEY,
+    data TEXT,
+    mime_type VARCHAR,
+    fetched_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL
+);
@@ -0,0 +1,8 @@
+-- Migration: Create housekeeping runs
+-- Date: 2026-10-18
+-- Description: When housekeeping last ran, so that of all the workers waking up each interval only one runs it.
+
+CREATE TABLE IF NOT EXISTS housekeeping_runs (
+    name VARCHAR NOT NULL PRIMARY KEY,
+    last_run_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
@@ -0,0 +1,19 @@
+-- Migration: Create jobs
+-- Date: 2026-10-18
+-- Description: Background jobs for long upstream operations, so any worker can report their progress.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    uuid VARCHAR NOT NULL PRIMARY KEY,
+    owner VARCHAR NOT NULL,
+    kind VARCHAR NOT NULL,
+    status VARCHAR NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_owner_created_at
+ON jobs (owner, created_at);
@@ -0,0 +1,7 @@
+-- Migration: Index item_view_history for retention
+-- Date: 2026-10-18
+-- Description: Lets history trimming find a user's oldest views without scanning the whole table. The uuid makes
+-- the index cover history paging cursors too.
+
+CREATE INDEX IF NOT EXISTS ix_item_view_history_user_uuid_created_at_uuid
+ON item_view_history (user_uuid, created_at, uuid);
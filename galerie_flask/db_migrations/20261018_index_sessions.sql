@@ -0,0 +1,10 @@
+-- Migration: Index sessions
+-- Date: 2026-10-18
+-- Description: Session management filters sessions by user, and housekeeping looks for expired sessions by
+-- creation time.
+
+CREATE INDEX IF NOT EXISTS ix_sessions_user_uuid
+ON sessions (user_uuid);
+
+CREATE INDEX IF NOT EXISTS ix_sessions_created_at
+ON sessions (created_at);
@@ -0,0 +1,25 @@
+-- Migration: Store viewed entries once in history_entries
+-- Date: 2026-10-18
+-- Description: Adds the deduplicated, compressed history_entries store and the columns item_view_history rows use
+-- to point into it. Existing rows keep their miniflux_entry until `flask compact-item-view-history` moves them.
+
+CREATE TABLE IF NOT EXISTS history_entries (
+    entry_id VARCHAR NOT NULL,
+    content_hash VARCHAR NOT NULL,
+    data BYTEA NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+    PRIMARY KEY (entry_id, content_hash)
+);
+
+ALTER TABLE item_view_history
+ADD COLUMN IF NOT EXISTS entry_id VARCHAR;
+
+ALTER TABLE item_view_history
+ADD COLUMN IF NOT EXISTS entry_hash VARCHAR;
+
+ALTER TABLE item_view_history
+ALTER COLUMN miniflux_entry DROP NOT NULL;
+
+-- lets history trimming tell whether a stored entry is still referenced
+CREATE INDEX IF NOT EXISTS ix_item_view_history_entry_id_entry_hash
+ON item_view_history (entry_id, entry_hash);
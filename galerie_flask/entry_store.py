@@ -0,0 +1,125 @@
+import json
+import zlib
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+from sqlalchemy import insert, tuple_, update, bindparam, null
+from sqlalchemy.dialects import postgresql, sqlite
+from galerie.miniflux_aggregator import trim_entry_dict
+from .db import db, ItemViewHistory, HistoryEntry
+
+
+ENTRY_COMPRESSION_LEVEL = 6
+COMPACT_HISTORY_BATCH_SIZE = 500
+
+
+def encode_entry(entry_dict: dict) -> Tuple[str, str, bytes]:
+    """(entry id, content hash, compressed data) of an entry as kept in history_entries."""
+    entry = trim_entry_dict(entry_dict)
+    # a viewed entry is read anyway, and leaving its live status out lets repeat views share one row
+    entry['status'] = 'read'
+    serialized = json.dumps(entry, sort_keys=True, separators=(',', ':')).encode()
+    content_hash = hashlib.sha256(serialized).hexdigest()[:32]
+    return str(entry['id']), content_hash, zlib.compress(serialized, ENTRY_COMPRESSION_LEVEL)
+
+
+def decode_entry(data: bytes) -> dict:
+    return json.loads(zlib.decompress(data))
+
+
+def _insert_ignoring_existing():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(HistoryEntry.__table__).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(HistoryEntry.__table__).on_conflict_do_nothing()
+    return None
+
+
+def store_entries(entries: Iterable[Tuple[str, str, bytes]]):
+    """Add encoded entries to the session, skipping ones that are stored already. The caller commits."""
+    rows = {
+        (entry_id, content_hash): {"entry_id": entry_id, "content_hash": content_hash, "data": data}
+        for entry_id, content_hash, data in entries
+    }
+    if not rows:
+        return
+
+    statement = _insert_ignoring_existing()
+    if statement is None:
+        existing = db.session.query(HistoryEntry.entry_id, HistoryEntry.content_hash).filter(
+            tuple_(HistoryEntry.entry_id, HistoryEntry.content_hash).in_(list(rows.keys()))
+        ).all()
+        for key in existing:
+            rows.pop(tuple(key), None)
+        if not rows:
+            return
+        statement = insert(HistoryEntry.__table__)
+    db.session.execute(statement, list(rows.values()))
+
+
+def load_entry_dicts(views: List[ItemViewHistory]) -> Dict[str, dict]:
+    """The entry of every given view by view uuid, from the entry store or from legacy rows, with one query."""
+    keys = {(view.entry_id, view.entry_hash) for view in views if view.entry_id and view.entry_hash}
+    stored: Dict[Tuple[str, str], bytes] = {}
+    if keys:
+        for entry_id, content_hash, data in db.session.query(
+                HistoryEntry.entry_id, HistoryEntry.content_hash, HistoryEntry.data
+        ).filter(tuple_(HistoryEntry.entry_id, HistoryEntry.content_hash).in_(list(keys))):
+            stored[(entry_id, content_hash)] = data
+
+    entry_dicts = {}
+    for view in views:
+        data = stored.get((view.entry_id, view.entry_hash))
+        if data is not None:
+            entry_dicts[view.uuid] = decode_entry(data)
+        elif view.miniflux_entry:
+            entry_dicts[view.uuid] = view.miniflux_entry
+    return entry_dicts
+
+
+@dataclass
+class CompactionResult:
+    moved: int = 0
+    skipped_uuids: List[str] = field(default_factory=list)
+
+
+def compact_legacy_history(
+        batch_size: int = COMPACT_HISTORY_BATCH_SIZE,
+        on_batch: Optional[Callable[[CompactionResult], None]] = None) -> CompactionResult:
+    """Move the entries of legacy view rows into the entry store, one committed batch at a time."""
+    result = CompactionResult()
+    last_uuid = ''
+    while True:
+        views = db.session.query(ItemViewHistory.uuid, ItemViewHistory.miniflux_entry).filter(
+            ItemViewHistory.miniflux_entry.isnot(None),
+            ItemViewHistory.uuid > last_uuid,
+        ).order_by(ItemViewHistory.uuid).limit(batch_size).all()
+        if not views:
+            return result
+        last_uuid = views[-1].uuid
+
+        encoded = {}
+        for uuid, miniflux_entry in views:
+            try:
+                encoded[uuid] = encode_entry(miniflux_entry)
+            except (KeyError, TypeError):
+                # not an entry the history could render either, leave the row as it is
+                result.skipped_uuids.append(uuid)
+        if not encoded:
+            continue
+
+        store_entries(encoded.values())
+        db.session.execute(
+            update(ItemViewHistory.__table__)
+            .where(ItemViewHistory.__table__.c.uuid == bindparam('b_uuid'))
+            .values(entry_id=bindparam('b_entry_id'), entry_hash=bindparam('b_entry_hash'), miniflux_entry=null()),
+            [
+                {"b_uuid": uuid, "b_entry_id": entry_id, "b_entry_hash": content_hash}
+                for uuid, (entry_id, content_hash, _) in encoded.items()
+            ]
+        )
+        db.session.commit()
+        result.moved += len(encoded)
+        if on_batch:
+            on_batch(result)
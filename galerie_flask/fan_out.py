@@ -0,0 +1,27 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+from flask import copy_current_request_context, g
+
+
+FAN_OUT_MAX_WORKERS = 8
+
+# shared by all requests of a worker process
+_executor = ThreadPoolExecutor(max_workers=FAN_OUT_MAX_WORKERS, thread_name_prefix='fan-out')
+
+
+def _in_request_context(call: Callable[[], Any]) -> Callable[[], Any]:
+    # pushing the copied request context creates a fresh app context, so carry g (e.g. g.aggregator) over by hand
+    g_values = dict(vars(g))
+
+    @copy_current_request_context
+    def run():
+        for name, value in g_values.items():
+            setattr(g, name, value)
+        return call()
+    return run
+
+
+def submit(call: Callable[[], Any]) -> Future:
+    """Start a call in the background within the current request, for results that are only needed later on."""
+    return _executor.submit(_in_request_context(call))
+
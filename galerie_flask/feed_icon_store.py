@@ -0,0 +1,119 @@
+import base64
+import datetime
+import hashlib
+from typing import Iterable, Optional
+from dataclasses import dataclass
+from urllib.parse import unquote_to_bytes
+from flask import current_app
+from sentry_sdk import capture_exception
+from galerie.rss_aggregator import RssAggregator
+from galerie.ttl_cache import TtlCache
+from .db import db, StoredFeedIcon
+
+
+FEED_ICON_MEMORY_TTL_SECONDS = 60 * 60
+FEED_ICON_MEMORY_MAX_SIZE = 4096
+FEED_ICON_REFRESH_DAYS = 30
+MISSING_FEED_ICON_RETRY_DAYS = 1
+
+
+@dataclass(frozen=True)
+class CachedFeedIcon:
+    body: Optional[bytes]
+    mime_type: str
+    etag: str
+    fetched_at: datetime.datetime
+
+    @property
+    def missing(self) -> bool:
+        return self.body is None
+
+    def is_stale(self) -> bool:
+        max_age = datetime.timedelta(days=MISSING_FEED_ICON_RETRY_DAYS if self.missing else FEED_ICON_REFRESH_DAYS)
+        return self.fetched_at < datetime.datetime.now() - max_age
+
+
+def _decode_icon_data(data: str) -> bytes:
+    header, _, payload = data.partition(',')
+    if header.endswith(';base64'):
+        return base64.b64decode(payload)
+    return unquote_to_bytes(payload)
+
+
+def _to_cached_feed_icon(data: Optional[str], mime_type: Optional[str], fetched_at: datetime.datetime) -> CachedFeedIcon:
+    if not data:
+        return CachedFeedIcon(body=None, mime_type='', etag='', fetched_at=fetched_at)
+    body = _decode_icon_data(data)
+    return CachedFeedIcon(
+        body=body,
+        mime_type=mime_type or data.split(';')[0],
+        etag=hashlib.sha256(body).hexdigest()[:16],
+        fetched_at=fetched_at,
+    )
+
+
+class FeedIconStore(object):
+    """Feed icons kept in an in-process LRU in front of the feed_icons table, fetched from upstream on a miss."""
+
+    def __init__(self):
+        self._memory: TtlCache[str, CachedFeedIcon] = TtlCache(
+            ttl_seconds=FEED_ICON_MEMORY_TTL_SECONDS,
+            max_size=FEED_ICON_MEMORY_MAX_SIZE,
+        )
+
+    @staticmethod
+    def _has_db() -> bool:
+        return 'sqlalchemy' in current_app.extensions
+
+    def warm_up(self, fids: Iterable[str]):
+        """Load the icons of all given feeds that aren't in memory yet with a single query."""
+        missing_fids = [fid for fid in set(fids) if self._memory.get(fid) is None]
+        if not missing_fids or not self._has_db():
+            return
+        for stored in db.session.query(StoredFeedIcon).filter(StoredFeedIcon.fid.in_(missing_fids)).all():
+            self._memory.set(stored.fid, _to_cached_feed_icon(stored.data, stored.mime_type, stored.fetched_at))
+
+    def url_for(self, fid: str) -> Optional[str]:
+        """URL of the icon of a feed, None when the feed is known to have no icon."""
+        cached = self._memory.get(fid)
+        if cached is None:
+            return f'/feed_icon/{fid}'
+        if cached.missing:
+            return None
+        # the version makes the long-lived browser cache safe across icon changes
+        return f'/feed_icon/{fid}?v={cached.etag}'
+
+    def get(self, aggregator: RssAggregator, fid: str) -> CachedFeedIcon:
+        cached = self._memory.get(fid)
+        if cached is None:
+            self.warm_up([fid])
+            cached = self._memory.get(fid)
+        if cached is not None and not cached.is_stale():
+            return cached
+
+        try:
+            feed_icon = aggregator.get_feed_icon(fid)
+        except Exception as e:
+            # only a "no icon" answer is remembered as missing, a failed fetch keeps what was there
+            if cached is None:
+                raise
+            capture_exception(e)
+            return cached
+        fetched_at = datetime.datetime.now()
+        data = feed_icon.data if feed_icon else None
+        mime_type = feed_icon.mime_type if feed_icon else None
+        cached = _to_cached_feed_icon(data, mime_type, fetched_at)
+        self._memory.set(fid, cached)
+
+        if self._has_db():
+            try:
+                db.session.merge(StoredFeedIcon(fid=fid, data=data, mime_type=mime_type, fetched_at=fetched_at))
+                db.session.commit()
+            except Exception as e:
+                # another worker stored the same icon at the same time, the memory copy is good enough
+                db.session.rollback()
+                capture_exception(e)
+        return cached
+
+
+feed_icon_store = FeedIconStore()
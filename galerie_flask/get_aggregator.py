@@ -1,37 +1,64 @@
 import os
+import hashlib
 from typing import Optional, Tuple
-from flask import request
-from galerie.rss_aggregator import RssAggregator
+from flask import request, g
 from galerie.miniflux_aggregator import MinifluxAggregator
+from galerie.caching_aggregator import CachingAggregator
+from galerie.ttl_cache import TtlCache
 from .miniflux_admin import get_miniflux_admin
 
 
-def get_aggregator(login_username: Optional[str]=None, login_password: Optional[str]=None) -> Optional[Tuple[RssAggregator, Optional[str]]]:
+AGGREGATOR_IDLE_SECONDS = 15 * 60
+AGGREGATOR_REGISTRY_MAX_SIZE = 256
+
+# per-worker registry so that each user's miniflux client (and its keep-alive connection pool) survives across requests
+_aggregators: TtlCache[Tuple[str, str, str], CachingAggregator] = TtlCache(
+    ttl_seconds=AGGREGATOR_IDLE_SECONDS,
+    max_size=AGGREGATOR_REGISTRY_MAX_SIZE,
+    sliding=True,
+)
+
+
+def _credential_fingerprint(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def get_or_create_aggregator(endpoint: str, username: str, password: str, managed_or_self_hosted: bool) -> CachingAggregator:
+    key = (endpoint, username, _credential_fingerprint(password))
+    aggregator = _aggregators.get(key)
+    if aggregator is None:
+        aggregator = CachingAggregator(MinifluxAggregator(endpoint, username, password, managed_or_self_hosted))
+        _aggregators.set(key, aggregator)
+    return aggregator
+
+
+def get_aggregator(login_username: Optional[str]=None, login_password: Optional[str]=None) -> Optional[Tuple[CachingAggregator, Optional[str]]]:
     # self-hosted instance
     env_endpoint = os.getenv('MINIFLUX_ENDPOINT')
     env_username = os.getenv('MINIFLUX_USERNAME')
     env_password = os.getenv('MINIFLUX_PASSWORD')
     if env_endpoint and env_username and env_password:
-        return MinifluxAggregator(
+        return get_or_create_aggregator(
             env_endpoint,
             env_username,
             env_password,
             False
         ), None
-    
+
     # managed instance
     miniflux_admin = get_miniflux_admin()
-    
+
     session_token = request.cookies.get('session_token')
     if not session_token:
         if not login_username or not login_password:
             return None, None
         session_token = miniflux_admin.log_in(login_username, login_password)
-    
-    miniflux_username, miniflux_password = miniflux_admin.verify_session(session_token)
-    return MinifluxAggregator(
+
+    user_session = miniflux_admin.verify_session(session_token)
+    g.user_session = user_session
+    return get_or_create_aggregator(
         miniflux_admin.base_url,
-        miniflux_username,
-        miniflux_password,
+        user_session.username,
+        user_session.miniflux_password,
         True
     ), session_token
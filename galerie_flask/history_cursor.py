@@ -0,0 +1,30 @@
+import base64
+import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import tuple_
+from .db import db, ItemViewHistory
+
+
+def encode_cursor(view: ItemViewHistory) -> str:
+    """Opaque position right after `view` in a user's history, newest first."""
+    raw = f"{view.created_at.isoformat()}|{view.uuid}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime.datetime, str]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, uuid = raw.split('|', 1)
+        return datetime.datetime.fromisoformat(created_at), uuid
+    except ValueError:
+        return None
+
+
+def get_history_page(user_uuid: str, count: int, after: Optional[Tuple[datetime.datetime, str]] = None) \
+        -> Tuple[List[ItemViewHistory], str]:
+    """Up to `count` views of a user, newest first, after the decoded cursor `after`, and the cursor of the next page."""
+    query = db.session.query(ItemViewHistory).filter(ItemViewHistory.user_uuid == user_uuid)
+    if after is not None:
+        query = query.filter(tuple_(ItemViewHistory.created_at, ItemViewHistory.uuid) < tuple_(*after))
+    views = query.order_by(ItemViewHistory.created_at.desc(), ItemViewHistory.uuid.desc()).limit(count).all()
+    return views, encode_cursor(views[-1]) if views else ''
@@ -0,0 +1,119 @@
+import queue
+import atexit
+import datetime
+import collections
+import threading
+from uuid import uuid4
+from typing import List, Optional
+from flask import Flask
+from sentry_sdk import capture_exception
+from sqlalchemy import insert
+from .db import db, ItemViewHistory
+from .entry_store import encode_entry, store_entries
+from .history_retention import AmortizedTrimmer, adjust_history_counts
+
+
+HISTORY_QUEUE_MAX_SIZE = 1000
+HISTORY_BATCH_SIZE = 100
+HISTORY_FLUSH_INTERVAL_SECONDS = 1
+# how long a request waits for room in a full queue before writing its view itself
+HISTORY_ENQUEUE_TIMEOUT_SECONDS = 0.5
+
+
+class HistoryRecorder(object):
+    """Records item views in batches from a background thread instead of committing one row per request."""
+
+    def __init__(self):
+        self._app: Optional[Flask] = None
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=HISTORY_QUEUE_MAX_SIZE)
+        # held while a batch is taken off the queue and written, so flush() returns only after in-flight views landed
+        self._write_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._trimmer = AmortizedTrimmer()
+
+    def init_app(self, app: Flask):
+        self._app = app
+        atexit.register(self.flush)
+
+    def record(self, user_uuid: str, item_uid: str, miniflux_entry: dict):
+        row = {
+            "uuid": str(uuid4()),
+            "user_uuid": user_uuid,
+            "item_uid": item_uid,
+            "miniflux_entry": miniflux_entry,
+            # taken now rather than at insert time, the history is ordered by it
+            "created_at": datetime.datetime.now(),
+        }
+        self._ensure_thread()
+        try:
+            self._queue.put(row, timeout=HISTORY_ENQUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            self._write([row])
+
+    def flush(self):
+        with self._write_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return
+                self._write(batch)
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='history-recorder', daemon=True)
+                self._thread.start()
+
+    def _take_batch(self, first: Optional[dict] = None) -> List[dict]:
+        batch = [first] if first is not None else []
+        while len(batch) < HISTORY_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=HISTORY_FLUSH_INTERVAL_SECONDS)
+            except queue.Empty:
+                continue
+            with self._write_lock:
+                self._write(self._take_batch(first))
+
+    def _write(self, rows: List[dict]):
+        with self._app.app_context():
+            try:
+                entries = []
+                views = []
+                for row in rows:
+                    entry_id, content_hash, data = encode_entry(row["miniflux_entry"])
+                    entries.append((entry_id, content_hash, data))
+                    views.append({
+                        "uuid": row["uuid"],
+                        "user_uuid": row["user_uuid"],
+                        "item_uid": row["item_uid"],
+                        "entry_id": entry_id,
+                        "entry_hash": content_hash,
+                        "created_at": row["created_at"],
+                    })
+                store_entries(entries)
+                db.session.execute(insert(ItemViewHistory.__table__), views)
+                adjust_history_counts(collections.Counter(row["user_uuid"] for row in rows))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                capture_exception(e)
+                return
+
+            # keeps histories near their limit a few rows at a time instead of letting the periodic sweep do it all
+            try:
+                self._trimmer.trim(self._trimmer.note_views(row["user_uuid"] for row in rows))
+            except Exception as e:
+                db.session.rollback()
+                capture_exception(e)
+
+
+history_recorder = HistoryRecorder()
@@ -0,0 +1,154 @@
+import time
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import and_, exists, func, tuple_, update, bindparam, select
+from .db import db, User, ItemViewHistory, HistoryEntry
+
+
+HISTORY_TRIM_BATCH_SIZE = 500
+# the write path trims a user's history once per this many recorded views
+HISTORY_TRIM_EVERY_VIEWS = 20
+
+
+class RetentionMetrics(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {
+            "users_trimmed": 0,
+            "views_deleted": 0,
+            "entries_deleted": 0,
+            "batches": 0,
+            "last_sweep_seconds": 0.0,
+            "last_sweep_views_deleted": 0,
+        }
+
+    def add(self, **increments: int):
+        with self._lock:
+            for name, increment in increments.items():
+                self._values[name] += increment
+
+    def set(self, **values: float):
+        with self._lock:
+            self._values.update(values)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+retention_metrics = RetentionMetrics()
+
+
+def adjust_history_counts(deltas: Dict[str, int]):
+    """Add to the cached history count of users. The caller commits, with the rows the deltas are about."""
+    deltas = {user_uuid: delta for user_uuid, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    users = User.__table__.c
+    db.session.execute(
+        update(User.__table__)
+        .where(users.uuid == bindparam('b_uuid'))
+        .values(history_count=users.history_count + bindparam('b_delta')),
+        [{"b_uuid": user_uuid, "b_delta": delta} for user_uuid, delta in deltas.items()]
+    )
+
+
+def recount_history():
+    """Set every user's cached history count from the rows actually there, to correct any drift."""
+    users = User.__table__.c
+    views = ItemViewHistory.__table__.c
+    db.session.execute(update(User.__table__).values(
+        history_count=select(func.count()).where(views.user_uuid == users.uuid).scalar_subquery()
+    ))
+    db.session.commit()
+
+
+def _delete_orphaned_entries(keys: Set[Tuple[str, str]]) -> int:
+    if not keys:
+        return 0
+    views = ItemViewHistory.__table__.c
+    entries = HistoryEntry.__table__.c
+    result = db.session.execute(
+        HistoryEntry.__table__.delete().where(
+            tuple_(entries.entry_id, entries.content_hash).in_(list(keys)),
+            ~exists().where(and_(views.entry_id == entries.entry_id, views.entry_hash == entries.content_hash)),
+        )
+    )
+    return result.rowcount
+
+
+def trim_user_history(user_uuid: str, history_limit: int, batch_size: int = HISTORY_TRIM_BATCH_SIZE) -> int:
+    """Delete a user's views beyond their newest `history_limit`, committing every batch."""
+    cutoff = db.session.query(ItemViewHistory.created_at, ItemViewHistory.uuid).filter(
+        ItemViewHistory.user_uuid == user_uuid
+    ).order_by(ItemViewHistory.created_at.desc(), ItemViewHistory.uuid.desc()).offset(history_limit).limit(1).first()
+    if cutoff is None:
+        return 0
+    cutoff_created_at, cutoff_uuid = cutoff
+
+    deleted = 0
+    while True:
+        batch = db.session.query(ItemViewHistory.uuid, ItemViewHistory.entry_id, ItemViewHistory.entry_hash).filter(
+            ItemViewHistory.user_uuid == user_uuid,
+            tuple_(ItemViewHistory.created_at, ItemViewHistory.uuid) <= tuple_(cutoff_created_at, cutoff_uuid),
+        ).order_by(ItemViewHistory.created_at, ItemViewHistory.uuid).limit(batch_size).all()
+        if not batch:
+            break
+
+        db.session.query(ItemViewHistory).filter(
+            ItemViewHistory.uuid.in_([uuid for uuid, _, _ in batch])
+        ).delete(synchronize_session=False)
+        entries_deleted = _delete_orphaned_entries(
+            {(entry_id, entry_hash) for _, entry_id, entry_hash in batch if entry_id and entry_hash}
+        )
+        adjust_history_counts({user_uuid: -len(batch)})
+        db.session.commit()
+
+        deleted += len(batch)
+        retention_metrics.add(views_deleted=len(batch), entries_deleted=entries_deleted, batches=1)
+
+    if deleted:
+        retention_metrics.add(users_trimmed=1)
+    return deleted
+
+
+def sweep_history(batch_size: int = HISTORY_TRIM_BATCH_SIZE) -> int:
+    """Trim the history of every user who is over their limit."""
+    started_at = time.monotonic()
+    over_limit = db.session.query(User.uuid, User.history_limit).filter(
+        User.history_count > User.history_limit
+    ).all()
+
+    deleted = 0
+    for user_uuid, history_limit in over_limit:
+        deleted += trim_user_history(user_uuid, history_limit, batch_size)
+
+    retention_metrics.set(last_sweep_seconds=round(time.monotonic() - started_at, 3), last_sweep_views_deleted=deleted)
+    return deleted
+
+
+class AmortizedTrimmer(object):
+    """Counts recorded views per user and says whose history is due for a trim."""
+
+    def __init__(self, every_views: int = HISTORY_TRIM_EVERY_VIEWS):
+        self.every_views = every_views
+        self._lock = threading.Lock()
+        self._views_since_trim: Dict[str, int] = {}
+
+    def note_views(self, user_uuids: Iterable[str]) -> List[str]:
+        due = []
+        with self._lock:
+            for user_uuid in user_uuids:
+                count = self._views_since_trim.get(user_uuid, 0) + 1
+                if count >= self.every_views:
+                    due.append(user_uuid)
+                    count = 0
+                self._views_since_trim[user_uuid] = count
+        return list(dict.fromkeys(due))
+
+    def trim(self, user_uuids: List[str]):
+        if not user_uuids:
+            return
+        for user_uuid, history_limit in db.session.query(User.uuid, User.history_limit).filter(
+                User.uuid.in_(user_uuids), User.history_count > User.history_limit).all():
+            trim_user_history(user_uuid, history_limit)
@@ -0,0 +1,146 @@
+import os
+import time
+import fcntl
+import random
+import datetime
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from flask import Flask
+from sentry_sdk import capture_exception
+from sqlalchemy import text
+from .db import db, HousekeepingRun
+from .miniflux_admin import delete_expired_sessions
+from .history_retention import sweep_history
+from .jobs import delete_finished_jobs
+
+
+# 0 turns the in-process scheduler off, for deployments that run `flask housekeeping` from cron instead
+HOUSEKEEPING_INTERVAL_SECONDS = int(os.getenv('HOUSEKEEPING_INTERVAL_SECONDS', '3600'))
+# spreads the workers' wake-ups so they don't all queue up on the lock at once
+HOUSEKEEPING_JITTER_SECONDS = 60
+# arbitrary, only has to be the same in every process
+HOUSEKEEPING_ADVISORY_LOCK_KEY = 4319217
+
+
+HOUSEKEEPING_TASKS: List[Tuple[str, Callable[[], int]]] = [
+    ('expired_sessions', delete_expired_sessions),
+    ('item_view_history', sweep_history),
+    ('finished_jobs', delete_finished_jobs),
+]
+
+
+class TaskTimings(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings: Dict[str, dict] = {
+            name: {"runs": 0, "failures": 0, "last_run_at": None, "last_seconds": None, "last_rows": None}
+            for name, _ in HOUSEKEEPING_TASKS
+        }
+
+    def record(self, name: str, seconds: float, rows: Optional[int]):
+        with self._lock:
+            timing = self._timings[name]
+            timing["runs"] += 1
+            if rows is None:
+                timing["failures"] += 1
+            timing["last_run_at"] = datetime.datetime.now().replace(microsecond=0)
+            timing["last_seconds"] = round(seconds, 3)
+            timing["last_rows"] = rows
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: dict(timing) for name, timing in self._timings.items()}
+
+
+task_timings = TaskTimings()
+
+
+@contextmanager
+def _housekeeping_lock() -> Iterator[bool]:
+    """Whether this process may run housekeeping now; at most one process across all workers gets True."""
+    if db.engine.dialect.name == 'postgresql':
+        # held on a connection of its own, the tasks commit on the session's connections as they go
+        with db.engine.connect() as connection:
+            acquired = connection.execute(
+                text('SELECT pg_try_advisory_lock(:key)'), {"key": HOUSEKEEPING_ADVISORY_LOCK_KEY}
+            ).scalar()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.execute(text('SELECT pg_advisory_unlock(:key)'), {"key": HOUSEKEEPING_ADVISORY_LOCK_KEY})
+                connection.commit()
+        return
+
+    # other databases are local development ones, where the workers at least share a machine
+    with open(os.path.join(tempfile.gettempdir(), 'galerie-housekeeping.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _is_due() -> bool:
+    last_run = db.session.get(HousekeepingRun, 'housekeeping')
+    return last_run is None or \
+        last_run.last_run_at < datetime.datetime.now() - datetime.timedelta(seconds=HOUSEKEEPING_INTERVAL_SECONDS)
+
+
+def run_housekeeping(only_if_due: bool = True) -> bool:
+    """Run every task once unless another process is at it or, with `only_if_due`, did so this interval."""
+    with _housekeeping_lock() as acquired:
+        if not acquired or (only_if_due and not _is_due()):
+            return False
+        db.session.merge(HousekeepingRun(name='housekeeping', last_run_at=datetime.datetime.now()))
+        db.session.commit()
+        for name, task in HOUSEKEEPING_TASKS:
+            started_at = time.monotonic()
+            try:
+                rows = task()
+            except Exception as e:
+                db.session.rollback()
+                capture_exception(e)
+                rows = None
+            task_timings.record(name, time.monotonic() - started_at, rows)
+        return True
+
+
+class HousekeepingScheduler(object):
+    """Wakes up every HOUSEKEEPING_INTERVAL_SECONDS in each worker; the first to find housekeeping due runs it."""
+
+    def __init__(self):
+        self._app: Optional[Flask] = None
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app: Flask):
+        self._app = app
+        if HOUSEKEEPING_INTERVAL_SECONDS > 0:
+            app.before_request(self._ensure_thread)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='housekeeping', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(HOUSEKEEPING_INTERVAL_SECONDS + random.uniform(0, HOUSEKEEPING_JITTER_SECONDS))
+            with self._app.app_context():
+                try:
+                    run_housekeeping()
+                except Exception as e:
+                    capture_exception(e)
+
+
+housekeeping_scheduler = HousekeepingScheduler()
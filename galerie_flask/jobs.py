@@ -0,0 +1,158 @@
+import datetime
+import threading
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Optional, TypeVar
+from flask import Flask, current_app, g
+from sentry_sdk import capture_exception
+from galerie.rss_aggregator import RssAggregator
+from .db import db, Job
+
+
+JOB_MAX_WORKERS = 2
+# upstream calls the jobs of a worker process make at a time, together
+JOB_ITEM_CONCURRENCY = 4
+# progress is written at most this often while a job runs
+JOB_PROGRESS_WRITE_SECONDS = 1
+# a running job not heard from for this long, or a job queued this long ago and never started, was lost with its worker
+JOB_STALE_SECONDS = 5 * 60
+FINISHED_JOB_RETENTION_DAYS = 7
+
+
+T = TypeVar('T')
+
+_item_executor = ThreadPoolExecutor(max_workers=JOB_ITEM_CONCURRENCY, thread_name_prefix='job-item')
+
+
+class JobProgress(object):
+    """Counts of a running job, written to its row by the job's own thread."""
+
+    def __init__(self, job_uuid: str):
+        self.job_uuid = job_uuid
+        self.total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def run_each(self, items: Iterable[T], call: Callable[[T], None]):
+        """Call `call` on every item in the shared item pool, counting the ones that raise as failed."""
+        items = list(items)
+        with self._lock:
+            self.total += len(items)
+        self.write()
+
+        def run_one(item: T):
+            try:
+                call(item)
+                succeeded, failed = 1, 0
+            except Exception:
+                succeeded, failed = 0, 1
+            with self._lock:
+                self.succeeded += succeeded
+                self.failed += failed
+
+        futures = [_item_executor.submit(run_one, item) for item in items]
+        while wait(futures, timeout=JOB_PROGRESS_WRITE_SECONDS).not_done:
+            self.write()
+        self.write()
+
+    def write(self, status: str = 'running', error: Optional[str] = None):
+        with self._lock:
+            values = {
+                "status": status,
+                "total": self.total,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "error": error,
+                "updated_at": datetime.datetime.now(),
+            }
+            db.session.query(Job).filter_by(uuid=self.job_uuid).update(values)
+            db.session.commit()
+
+
+class JobRunner(object):
+    """Runs long upstream operations off the request and keeps their status in the jobs table."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=JOB_MAX_WORKERS, thread_name_prefix='job')
+
+    def start(self, owner: str, kind: str, run: Callable[[JobProgress], None]) -> str:
+        now = datetime.datetime.now()
+        job = Job(uuid=str(uuid4()), owner=owner, kind=kind, status='queued', created_at=now, updated_at=now)
+        db.session.add(job)
+        db.session.commit()
+        self._executor.submit(self._run, current_app._get_current_object(), job.uuid, run)
+        return job.uuid
+
+    def _run(self, app: Flask, job_uuid: str, run: Callable[[JobProgress], None]):
+        with app.app_context():
+            # a job given up on while it waited for a slot stays failed
+            started = db.session.query(Job).filter_by(uuid=job_uuid, status='queued').update(
+                {"status": "running", "updated_at": datetime.datetime.now()}, synchronize_session=False
+            )
+            db.session.commit()
+            if not started:
+                return
+
+            progress = JobProgress(job_uuid)
+            try:
+                run(progress)
+                progress.write('succeeded')
+            except Exception as e:
+                db.session.rollback()
+                capture_exception(e)
+                try:
+                    progress.write('failed', str(e))
+                except Exception as e:
+                    capture_exception(e)
+
+
+job_runner = JobRunner()
+
+
+def jobs_enabled() -> bool:
+    return 'sqlalchemy' in current_app.extensions
+
+
+def current_job_owner() -> str:
+    if 'user_session' in g:
+        return g.user_session.user_uuid
+    return g.aggregator.get_username()
+
+
+def _is_stale(job: Job, stale_before: datetime.datetime) -> bool:
+    if job.status == 'running':
+        return job.updated_at < stale_before
+    return job.status == 'queued' and job.created_at < stale_before
+
+
+def get_job(owner: str, job_uuid: str) -> Optional[Job]:
+    job = db.session.query(Job).filter_by(uuid=job_uuid, owner=owner).first()
+    stale_before = datetime.datetime.now() - datetime.timedelta(seconds=JOB_STALE_SECONDS)
+    if job and _is_stale(job, stale_before):
+        # only if it is still in the state that looked stale, the job may have just started or written progress
+        db.session.query(Job).filter(
+            Job.uuid == job_uuid,
+            Job.status == job.status,
+            Job.updated_at == job.updated_at,
+        ).update({"status": "failed", "error": "Interrupted"}, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(job)
+    return job
+
+
+def delete_finished_jobs() -> int:
+    """Delete jobs that haven't changed in FINISHED_JOB_RETENTION_DAYS, which by then are all done or lost."""
+    finished_before = datetime.datetime.now() - datetime.timedelta(days=FINISHED_JOB_RETENTION_DAYS)
+    deleted = db.session.query(Job).filter(Job.updated_at < finished_before).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def refresh_dead_feeds(aggregator: RssAggregator) -> Callable[[JobProgress], None]:
+    """Job that asks miniflux to refresh every feed with parsing errors."""
+    def run(progress: JobProgress):
+        dead_fids = [feed["id"] for feed in aggregator.client.get_feeds() if feed.get("parsing_error_count", 0)]
+        progress.run_each(dead_fids, aggregator.client.refresh_feed)
+        aggregator.invalidate_feeds()
+    return run
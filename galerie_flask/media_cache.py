@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from sentry_sdk import capture_exception
+
+
+# unset leaves the built-in media proxy uncached
+MEDIA_CACHE_DIR = os.getenv('GALERIE_MEDIA_CACHE_DIR', '')
+MEDIA_CACHE_MAX_BYTES = int(os.getenv('GALERIE_MEDIA_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+# bigger files are relayed but not kept, so a single long video can't flush the whole cache
+MEDIA_CACHE_MAX_FILE_BYTES = 128 * 1024 ** 2
+# partial files older than this were left behind by a worker that died while filling them
+MEDIA_CACHE_STALE_TEMP_SECONDS = 60 * 60
+
+
+@dataclass
+class CachedMedia:
+    path: str
+    content_type: str
+
+
+def media_etag(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+class MediaDiskCache(object):
+    """Upstream media kept on disk, least recently used files evicted once the total goes over `max_bytes`."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+
+    def get(self, url: str) -> Optional[CachedMedia]:
+        path = self._path(url)
+        try:
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedMedia(path=path, content_type=meta['content_type'])
+
+    def fill(self, url: str, content_type: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Relay `chunks` while writing them to the cache; the file is kept only if they are read to the end."""
+        path = self._path(url)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        size = 0
+        complete = False
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete and size <= MEDIA_CACHE_MAX_FILE_BYTES:
+                self._commit(path, temp_path, size, content_type)
+            else:
+                _remove(temp_path)
+
+    def _commit(self, path: str, temp_path: str, size: int, content_type: str):
+        try:
+            os.replace(temp_path, path)
+            meta_temp_path = temp_path + '.json'
+            with open(meta_temp_path, 'w') as f:
+                json.dump({"content_type": content_type, "size": size}, f)
+            # the metadata goes last, get() only sees media whose body is in place
+            os.replace(meta_temp_path, path + '.json')
+        except OSError as e:
+            _remove(temp_path)
+            capture_exception(e)
+            return
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+            over_limit = self._total_bytes is None or self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self):
+        """Delete the least recently used files until the cache fits, counting what other workers wrote too."""
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    if stat.st_mtime < time.time() - MEDIA_CACHE_STALE_TEMP_SECONDS:
+                        _remove(entry.path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                _remove(path + '.json')
+                _remove(path)
+                total -= size
+            self._total_bytes = total
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_media_cache: Optional[MediaDiskCache] = None
+_media_cache_lock = threading.Lock()
+
+
+def get_media_cache() -> Optional[MediaDiskCache]:
+    global _media_cache
+    if not MEDIA_CACHE_DIR:
+        return None
+    with _media_cache_lock:
+        if _media_cache is None:
+            _media_cache = MediaDiskCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
+        return _media_cache
@@ -0,0 +1,47 @@
+import requests
+from typing import Iterator, Optional
+from flask import Response
+
+
+MEDIA_CHUNK_SIZE = 64 * 1024
+# (connect, read) - the read timeout is per chunk, not for the whole body
+MEDIA_UPSTREAM_TIMEOUT_SECONDS = (5, 30)
+PASSTHROUGH_HEADERS = ['Content-Type', 'Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified']
+
+
+# one pooled session per worker, so repeat fetches from the same CDN reuse connections
+_upstream_session = requests.Session()
+_upstream_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32))
+
+
+def open_upstream(url: str, range_header: Optional[str] = None) -> requests.Response:
+    """Start fetching `url` without reading the body yet. The caller has to close the response."""
+    # identity, so Content-Length and Range offsets relayed to the client match the bytes relayed
+    headers = {'Accept-Encoding': 'identity'}
+    if range_header:
+        headers['Range'] = range_header
+    upstream = _upstream_session.get(url, headers=headers, stream=True, timeout=MEDIA_UPSTREAM_TIMEOUT_SECONDS)
+    try:
+        upstream.raise_for_status()
+    except requests.HTTPError:
+        upstream.close()
+        raise
+    return upstream
+
+
+def iter_upstream(upstream: requests.Response) -> Iterator[bytes]:
+    try:
+        for chunk in upstream.iter_content(MEDIA_CHUNK_SIZE):
+            if chunk:
+                yield chunk
+    finally:
+        upstream.close()
+
+
+def passthrough_response(upstream: requests.Response, body: Optional[Iterator[bytes]] = None) -> Response:
+    """A streamed response relaying `upstream`'s status, body and the headers that describe the body."""
+    resp = Response(body if body is not None else iter_upstream(upstream), status=upstream.status_code)
+    for header in PASSTHROUGH_HEADERS:
+        if header in upstream.headers:
+            resp.headers[header] = upstream.headers[header]
+    return resp
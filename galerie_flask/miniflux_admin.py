@@ -1,17 +1,29 @@
 import os
+import time
+import atexit
 import datetime
 import secrets
+import threading
 import miniflux
-from typing import Tuple
+from typing import Dict
 from uuid import uuid4
+from dataclasses import dataclass
+from flask import Flask
 from flask_babel import _
+from sentry_sdk import capture_exception
+from sqlalchemy import update, bindparam
 from werkzeug.security import generate_password_hash, check_password_hash
+from galerie.ttl_cache import TtlCache
 from .db import db, User, Session
 
 
 STARTING_FEED_LIMIT = 50
 STARTING_HISTORY_LIMIT = 500
 SESSION_EXPIRY_DAYS = 14
+EXPIRED_SESSION_BATCH_SIZE = 500
+SESSION_CACHE_TTL_SECONDS = 30
+SESSION_CACHE_MAX_SIZE = 4096
+SESSION_TOUCH_FLUSH_SECONDS = 60
 admin_username = os.getenv('ADMIN_USERNAME')
 
 
@@ -22,6 +34,94 @@ class MinifluxAdminException(Exception):
         self.expected = expected
 
 
+@dataclass
+class VerifiedSession:
+    session_uuid: str
+    user_uuid: str
+    username: str
+    miniflux_password: str
+    created_at: datetime.datetime
+
+
+# verified sessions are reused for a short while so that infinite scroll does not reload the user on every request;
+# the session row is still looked up each time, logging out or terminating sessions happens in any worker
+_verified_sessions: TtlCache[str, VerifiedSession] = TtlCache(
+    ttl_seconds=SESSION_CACHE_TTL_SECONDS,
+    max_size=SESSION_CACHE_MAX_SIZE,
+)
+
+# accessed_at updates are buffered and written in one batch at most every SESSION_TOUCH_FLUSH_SECONDS
+_session_touches: Dict[str, datetime.datetime] = {}
+_session_touches_lock = threading.Lock()
+_session_touches_flushed_at = time.monotonic()
+
+
+def _touch_session(session_uuid: str):
+    with _session_touches_lock:
+        _session_touches[session_uuid] = datetime.datetime.now()
+        if time.monotonic() - _session_touches_flushed_at < SESSION_TOUCH_FLUSH_SECONDS:
+            return
+    flush_session_touches()
+
+
+def flush_session_touches():
+    global _session_touches_flushed_at
+
+    with _session_touches_lock:
+        touches = [{"b_uuid": uuid, "b_accessed_at": accessed_at} for uuid, accessed_at in _session_touches.items()]
+        _session_touches.clear()
+        _session_touches_flushed_at = time.monotonic()
+    if not touches:
+        return
+
+    try:
+        db.session.execute(
+            update(Session.__table__)
+            .where(Session.__table__.c.uuid == bindparam('b_uuid'))
+            .values(accessed_at=bindparam('b_accessed_at')),
+            touches
+        )
+        db.session.commit()
+    except Exception as e:
+        # accessed_at is informational only, never fail a request because of it
+        db.session.rollback()
+        capture_exception(e)
+
+
+def init_session_touches(app: Flask):
+    def flush_at_exit():
+        with app.app_context():
+            flush_session_touches()
+    atexit.register(flush_at_exit)
+
+
+def _forget_session(session_uuid: str):
+    _verified_sessions.pop(session_uuid)
+    with _session_touches_lock:
+        _session_touches.pop(session_uuid, None)
+
+
+def forget_user_sessions(user_uuid: str, except_session_uuid: str):
+    _verified_sessions.pop_where(lambda uuid, s: s.user_uuid == user_uuid and uuid != except_session_uuid)
+
+
+def delete_expired_sessions(batch_size: int = EXPIRED_SESSION_BATCH_SIZE) -> int:
+    """Delete sessions past SESSION_EXPIRY_DAYS that were never presented again, one committed batch at a time."""
+    expired_before = datetime.datetime.now() - datetime.timedelta(days=SESSION_EXPIRY_DAYS)
+    deleted = 0
+    while True:
+        uuids = [uuid for uuid, in db.session.query(Session.uuid).filter(
+            Session.created_at < expired_before
+        ).limit(batch_size)]
+        if not uuids:
+            return deleted
+        db.session.query(Session).filter(Session.uuid.in_(uuids)).delete(synchronize_session=False)
+        db.session.commit()
+        for uuid in uuids:
+            _forget_session(uuid)
+        deleted += len(uuids)
+
+
 class MinifluxAdmin(object):
     def __init__(self, base_url: str, admin_username: str, admin_password: str):
         self.base_url = base_url
@@ -75,27 +175,47 @@ class MinifluxAdmin(object):
         return session_uuid
 
 
-    def verify_session(self, session_uuid: str) -> Tuple[str, str]:
-        session = db.session.query(Session).filter_by(uuid=session_uuid).first()
-        if not session:
+    def verify_session(self, session_uuid: str) -> VerifiedSession:
+        verified_session = _verified_sessions.get(session_uuid)
+        if verified_session and not db.session.query(Session.uuid).filter_by(uuid=session_uuid).first():
+            _forget_session(session_uuid)
             raise MinifluxAdminException(401, "Logged out", False)
-        
-        if session.created_at < datetime.datetime.now() - datetime.timedelta(days=SESSION_EXPIRY_DAYS):
-            db.session.delete(session)
+
+        if not verified_session:
+            row = db.session.query(Session, User) \
+                .outerjoin(User, User.uuid == Session.user_uuid) \
+                .filter(Session.uuid == session_uuid) \
+                .first()
+            if not row:
+                raise MinifluxAdminException(401, "Logged out", False)
+
+            session, user = row
+            if not user:
+                raise MinifluxAdminException(404, "User not found", False)
+
+            verified_session = VerifiedSession(
+                session_uuid=session.uuid,
+                user_uuid=user.uuid,
+                username=user.username,
+                miniflux_password=user.miniflux_password,
+                created_at=session.created_at,
+            )
+            _verified_sessions.set(session_uuid, verified_session)
+
+        if verified_session.created_at < datetime.datetime.now() - datetime.timedelta(days=SESSION_EXPIRY_DAYS):
+            _forget_session(session_uuid)
+            db.session.query(Session).filter_by(uuid=session_uuid).delete()
             db.session.commit()
             raise MinifluxAdminException(401, _("Your session has expired. Please log in again."), True)
 
-        user = db.session.query(User).filter_by(uuid=session.user_uuid).first()
-        if not user:
-            raise MinifluxAdminException(404, "User not found", False)
-        
-        session.accessed_at = datetime.datetime.now()
-        db.session.commit()
+        _touch_session(session_uuid)
 
-        return user.username, user.miniflux_password
+        return verified_session
     
 
     def log_out(self, session_uuid: str):
+        _forget_session(session_uuid)
+
         session = db.session.query(Session).filter_by(uuid=session_uuid).first()
         if not session:
             return
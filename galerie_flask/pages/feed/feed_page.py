@@ -3,6 +3,7 @@ from flask_babel import _
 from galerie.rendered_item import convert_rendered_items
 from galerie_flask.utils import requires_auth, items_args, DEFAULT_MAX_RENDERED_ITEMS
 from galerie_flask.pages_blueprint import catches_exceptions, requires_auth
+from galerie_flask.feed_icon_store import feed_icon_store
 
 
 feed_bp = Blueprint('feed', __name__, template_folder='.')
@@ -16,13 +17,13 @@ def feed_page():
     feed = g.aggregator.get_feed(fid)
     feed_icon = None
     if feed:
-        feed_icon = g.aggregator.get_feed_icon(fid)
+        feed_icon = feed_icon_store.url_for(fid)
 
     max_rendered_items = int(request.cookies.get('max_rendered_items', DEFAULT_MAX_RENDERED_ITEMS))
     no_text_mode = request.cookies.get('no_text_mode', '0') == '1'
     display_titles = request.cookies.get('display_titles', '1') == '1'
 
-    items = g.aggregator.get_feed_items_by_iid_descending(fid)
+    items = g.aggregator.get_feed_items_by_iid_descending(fid, max_media=max_rendered_items)
     rendered_items, iids_without_media = convert_rendered_items(items, max_rendered_items)
 
     args = {
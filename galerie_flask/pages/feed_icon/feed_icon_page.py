@@ -0,0 +1,37 @@
+from flask import Blueprint, g, make_response, request
+from galerie_flask.feed_icon_store import feed_icon_store
+from galerie_flask.pages_blueprint import catches_exceptions, requires_auth
+
+
+FEED_ICON_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+MISSING_FEED_ICON_MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+feed_icon_bp = Blueprint('feed_icon', __name__)
+
+
+@feed_icon_bp.route("/feed_icon/<fid>")
+@catches_exceptions
+@requires_auth
+def feed_icon(fid: str):
+    # the icon cache is shared between users, only serve it for the user's own feeds
+    try:
+        g.aggregator.find_feed_by_fid(fid)
+    except Exception:
+        return make_response('', 404)
+
+    cached = feed_icon_store.get(g.aggregator, fid)
+    if cached.missing:
+        resp = make_response('', 404)
+        resp.headers['Cache-Control'] = f'private, max-age={MISSING_FEED_ICON_MAX_AGE_SECONDS}'
+        return resp
+
+    resp = make_response(cached.body)
+    resp.mimetype = cached.mime_type
+    resp.set_etag(cached.etag)
+    if 'v' in request.args:
+        # the version changes with the icon, see feed_icon_store.url_for
+        resp.headers['Cache-Control'] = f'private, max-age={FEED_ICON_MAX_AGE_SECONDS}'
+    else:
+        resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp.make_conditional(request)
@@ -1,9 +1,15 @@
-from flask import Blueprint, render_template, g
+from flask import Blueprint, render_template, g, request, jsonify
 from flask_babel import _
-from galerie.twitter import is_nitter_url, extract_twitter_handle_from_nitter_feed_url, check_twitter_handle_status
+from galerie.twitter import is_nitter_url, extract_twitter_handle_from_nitter_feed_url
+from galerie.twitter_handle_prober import twitter_handle_prober
 from galerie_flask.pages_blueprint import catches_exceptions, requires_auth
 
 
+# how long one poll for account statuses waits for probes still running
+HANDLE_STATUSES_WAIT_SECONDS = 3
+HANDLE_STATUSES_MAX_HANDLES = 500
+
+
 feed_maintenance_bp = Blueprint('feed_maintenance', __name__, template_folder='.')
 
 
@@ -21,25 +27,38 @@ def feed_maintenance_page():
         'timeout': [],
         'x_protected': []
     }
+    # feeds whose account status isn't known yet are shown under their error for now and moved by the page later
+    pending_handles = {}
     for feed in dead_feeds:
         if "Client.Timeout" in feed.error_reason or 'i/o timeout' in feed.error_reason:
             reason = 'timeout'
         elif is_nitter_url(feed.url):
             handle = extract_twitter_handle_from_nitter_feed_url(feed.url)
-            if handle:
-                status = check_twitter_handle_status(handle)
-                if status:
-                    reason = f"x_{status}"
-                else:
-                    reason = feed.error_reason
+            status = twitter_handle_prober.cached(handle) if handle else ''
+            if status:
+                reason = f"x_{status}"
             else:
                 reason = feed.error_reason
+                if status is None:
+                    pending_handles[feed.fid] = handle
         else:
             reason = feed.error_reason
         
         dead_feeds_by_reason[reason] = dead_feeds_by_reason.get(reason, []) + [feed]
 
+    twitter_handle_prober.probe(pending_handles.values())
+
     return render_template(
         'feed_maintenance.html',
-        dead_feeds_by_reason=dead_feeds_by_reason
+        dead_feeds_by_reason=dead_feeds_by_reason,
+        pending_handles=pending_handles,
     )
+
+
+@feed_maintenance_bp.route("/feed_maintenance/twitter_handle_statuses")
+@catches_exceptions
+@requires_auth
+def twitter_handle_statuses():
+    handles = [handle for handle in request.args.get('handles', '').split(',') if handle]
+    statuses = twitter_handle_prober.wait(handles[:HANDLE_STATUSES_MAX_HANDLES], HANDLE_STATUSES_WAIT_SECONDS)
+    return jsonify(statuses)
@@ -1,6 +1,11 @@
-from flask import Blueprint, render_template, g, request
+import os
+from concurrent.futures import Future
+from typing import Any
+from flask import Blueprint, Response, render_template, stream_template, g, request
 from flask_babel import _
-from galerie.rendered_item import convert_rendered_items
+from markupsafe import Markup
+from sentry_sdk import capture_exception
+from galerie.rendered_item import convert_rendered_item
 from galerie_flask.utils import (
     requires_auth,
     items_args,
@@ -11,11 +16,24 @@ from galerie_flask.utils import (
     compute_read_percentage,
 )
 from galerie_flask.pages_blueprint import catches_exceptions, requires_auth
+from galerie_flask.fan_out import submit
+from galerie_flask.prefetch import next_page_prefetcher
 
 
 index_bp = Blueprint('index', __name__, template_folder='.')
 
 
+def _result_or(future: Future, default: Any) -> Any:
+    # the page is already half sent, so a failed late part degrades to its default instead of the error page
+    try:
+        return future.result()
+    except Exception as e:
+        if os.getenv('DEBUG', '0') == '1':
+            raise e
+        capture_exception(e)
+        return default
+
+
 @index_bp.route("/")
 @catches_exceptions
 @requires_auth
@@ -30,56 +48,90 @@ def index_page():
     infinite_scroll = request.cookies.get('infinite_scroll', '1') == '1'
     scroll_as_read = request.cookies.get('scroll_as_read', '0') == '1'
 
+    # counts and the feed list are only rendered at the end of the page, load them while the items are streamed
+    def get_groups_and_counts():
+        groups = g.aggregator.get_groups()
+        counts = g.aggregator.get_unread_items_count_by_group_ids([group.gid for group in groups], include_read)
+        return groups, counts
+    groups_and_counts_future = submit(get_groups_and_counts)
+    feeds_future = submit(g.aggregator.get_feeds)
+
     unread_items = g.aggregator.get_items(
         count=initial_page_size,
         from_iid_exclusive=None,
         group_id=gid,
         sort_by_id_descending=sort_by_desc,
-        include_read=include_read
+        include_read=include_read,
+        max_media=max_rendered_items
     )
-
-    rendered_items, iids_without_media = convert_rendered_items(unread_items, max_rendered_items)
     last_iid = unread_items[-1].iid if unread_items else ''
+    next_page_prefetcher.schedule(g.aggregator, max_items, last_iid, gid, sort_by_desc, include_read, max_rendered_items)
 
-    groups = g.aggregator.get_groups()
-    gids = [group.gid for group in groups]
-    all_group_counts = g.aggregator.get_unread_items_count_by_group_ids(gids, include_read)
-    all_unread_count = sum(all_group_counts.values())
-    groups = sorted(groups, key=lambda group: all_group_counts[group.gid], reverse=True)   
-    selected_group = next((group for group in groups if group.gid == gid), None)
+    def rendered_items():
+        for item in unread_items:
+            yield from convert_rendered_item(item, max_rendered_items)
+    iids_without_media = [
+        item.iid for item in unread_items if item.unread_or_not and not item.media[:max_rendered_items]
+    ]
 
-    total_count = all_group_counts[gid] if gid is not None else all_unread_count
-    remaining_count = total_count - initial_page_size if total_count > initial_page_size else 0
-    read_percentage = compute_read_percentage(remaining_count, total_count)
-    
-    all_feed_count = sum(group.feed_count for group in groups)
-    feeds = g.aggregator.get_feeds()
-    dead_feeds = list(filter(lambda f: f.error, feeds))
     args = {
-        "groups": groups,
-        "all_group_counts": all_group_counts,
-        "all_unread_count": all_unread_count,
-        "selected_group": selected_group,
+        "gid": gid if gid is not None else "",
+        "sort": "desc" if sort_by_desc else "asc",
+        "include_read": "1" if include_read else "0",
         "sort_by_desc": sort_by_desc,
         "last_iid": last_iid,
-        "all_feed_count": all_feed_count,
-        "feeds": feeds,
         "no_text_mode": no_text_mode,
         "scroll_as_read": scroll_as_read,
-        "read_percentage": read_percentage,
         "infinite_scroll": infinite_scroll,
-        "dead_feed_count": len(dead_feeds)
     }
-    items_args(args, rendered_items, True, gid is None, no_text_mode, iids_without_media)
-    load_more_button_args(
-        args=args,
-        from_iid=last_iid,
-        gid=gid,
-        sort_by_desc=sort_by_desc,
-        infinite_scroll=infinite_scroll,
-        remaining_count=remaining_count,
-        include_read=include_read,
-        total_count=total_count,
-    )
+    items_args(args, rendered_items(), True, gid is None, no_text_mode, iids_without_media,
+               fids=[item.fid for item in unread_items])
+
+    def render_late_parts(groups, all_group_counts, feeds) -> Markup:
+        all_unread_count = sum(all_group_counts.values())
+        groups = sorted(groups, key=lambda group: all_group_counts.get(group.gid, 0), reverse=True)
+        selected_group = next((group for group in groups if group.gid == gid), None)
+
+        total_count = all_group_counts.get(gid, 0) if gid is not None else all_unread_count
+        remaining_count = total_count - initial_page_size if total_count > initial_page_size else 0
+
+        late_args = dict(args)
+        late_args.update({
+            "groups": groups,
+            "all_group_counts": all_group_counts,
+            "all_unread_count": all_unread_count,
+            "selected_group": selected_group,
+            "all_feed_count": sum(group.feed_count for group in groups),
+            "feeds": feeds,
+            "read_percentage": compute_read_percentage(remaining_count, total_count),
+            "dead_feed_count": len([feed for feed in feeds if feed.error]),
+        })
+        load_more_button_args(
+            args=late_args,
+            from_iid=last_iid,
+            gid=gid,
+            sort_by_desc=sort_by_desc,
+            infinite_scroll=infinite_scroll,
+            remaining_count=remaining_count,
+            include_read=include_read,
+            total_count=total_count,
+        )
+        return Markup(render_template('index_late_parts.html', **late_args))
+
+    def render_late_parts_or_fallback() -> Markup:
+        # rendered to a string before any of it is sent, so a failure can still fall back to the empty late parts
+        groups, all_group_counts = _result_or(groups_and_counts_future, ([], {}))
+        feeds = _result_or(feeds_future, [])
+        try:
+            return render_late_parts(groups, all_group_counts, feeds)
+        except Exception as e:
+            if os.getenv('DEBUG', '0') == '1':
+                raise e
+            capture_exception(e)
+            return render_late_parts([], {}, [])
+    args["render_late_parts"] = render_late_parts_or_fallback
 
-    return render_template('index.html', **args)
+    resp = Response(stream_template('index.html', **args))
+    # let reverse proxies pass the chunks on as they come instead of buffering the whole page
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
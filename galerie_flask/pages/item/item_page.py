@@ -1,11 +1,12 @@
-from uuid import uuid4
 from flask import Blueprint, render_template, g, request
 from flask_babel import _
 from galerie.rendered_item import convert_rendered_item
 from galerie.twitter import extract_twitter_handle_from_url
 from galerie_flask.pages_blueprint import catches_exceptions, requires_auth
 from galerie_flask.utils import DEFAULT_MAX_RENDERED_ITEMS
-from galerie_flask.db import db, Session, ItemViewHistory
+from galerie_flask.history_recorder import history_recorder
+from galerie_flask.feed_icon_store import feed_icon_store
+from galerie_flask.prefetch import next_page_prefetcher
 
 
 item_bp = Blueprint('item', __name__, template_folder='.')
@@ -28,20 +29,15 @@ def item():
 
     if not from_history:
         g.aggregator.mark_items_as_read([iid])
+        next_page_prefetcher.invalidate(g.aggregator, [iid])
         # Record item view history (skip if from_history=1)
-        session_token = request.cookies.get('session_token')
-        session = db.session.query(Session).filter_by(uuid=session_token).first()
-        user_uuid = session.user_uuid
-        view_history = ItemViewHistory(
-            uuid=str(uuid4()),
-            user_uuid=user_uuid,
+        history_recorder.record(
+            user_uuid=g.user_session.user_uuid,
             item_uid=uid,
             miniflux_entry=miniflux_entry
         )
-        db.session.add(view_history)
-        db.session.commit()
 
-    feed_icon = g.aggregator.get_feed_icon(item.fid)
+    feed_icon = feed_icon_store.url_for(item.fid)
 
     rt = None
     rt_feed = None
@@ -50,14 +46,14 @@ def item():
     item_url = item.url
     item_twitter_handle = extract_twitter_handle_from_url(item_url)
     if item_twitter_handle:
-        feed = g.aggregator.get_feed(item.fid)
+        feed = g.aggregator.find_feed_by_fid(item.fid)
         feed_url = feed.url
         feed_twitter_handle = extract_twitter_handle_from_url(feed_url)
         if feed_twitter_handle and feed_twitter_handle != item_twitter_handle:
             rt = item_twitter_handle
             rt_feed = g.aggregator.find_feed_by_url(item_url)
             if rt_feed:
-                rt_feed_icon = g.aggregator.get_feed_icon(rt_feed.fid)
+                rt_feed_icon = feed_icon_store.url_for(rt_feed.fid)
 
     return render_template(
         'item.html',
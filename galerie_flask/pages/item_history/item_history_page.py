@@ -1,10 +1,13 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, g, request
 from flask_babel import _
 from galerie.rendered_item import convert_rendered_item
 from galerie.miniflux_aggregator import entry_dict_to_item
 from galerie_flask.utils import requires_auth, items_args, load_more_button_args, DEFAULT_MAX_ITEMS, DEFAULT_MAX_RENDERED_ITEMS, DEFAULT_INITIAL_PAGE_SIZE, compute_read_percentage
 from galerie_flask.pages_blueprint import catches_exceptions, requires_auth
-from galerie_flask.db import ItemViewHistory, Session, db
+from galerie_flask.db import User, db
+from galerie_flask.entry_store import load_entry_dicts
+from galerie_flask.history_recorder import history_recorder
+from galerie_flask.history_cursor import get_history_page
 
 
 item_history_bp = Blueprint('item_history', __name__, template_folder='.')
@@ -20,27 +23,23 @@ def item_history_page():
     no_text_mode = request.cookies.get('no_text_mode', '0') == '1'
     infinite_scroll = request.cookies.get('infinite_scroll', '1') == '1'
 
-    # Get user_uuid from session
-    session_token = request.cookies.get('session_token')
-    session = db.session.query(Session).filter_by(uuid=session_token).first()
-    user_uuid = session.user_uuid
+    user_uuid = g.user_session.user_uuid
 
-    # Count total history items
-    total_count = db.session.query(ItemViewHistory).filter_by(
-        user_uuid=user_uuid
-    ).count()
+    # views that are still queued should show up right away
+    history_recorder.flush()
+
+    total_count = max(db.session.query(User.history_count).filter_by(uuid=user_uuid).scalar() or 0, 0)
 
     # Query item view history for the current user, ordered by most recent first, limited
-    view_history = db.session.query(ItemViewHistory).filter_by(
-        user_uuid=user_uuid
-    ).order_by(ItemViewHistory.created_at.desc()).limit(initial_page_size).all()
+    view_history, next_cursor = get_history_page(user_uuid, initial_page_size)
 
     items = []
     item_indices = []  # Store the index for each item
+    entry_dicts = load_entry_dicts(view_history)
     for history_entry in view_history:
         try:
-            if history_entry.miniflux_entry:
-                item = entry_dict_to_item(history_entry.miniflux_entry)
+            if history_entry.uuid in entry_dicts:
+                item = entry_dict_to_item(entry_dicts[history_entry.uuid])
                 # Extract the index from item_uid (format: "iid-index")
                 index = int(history_entry.item_uid.split('-')[1])
                 items.append(item)
@@ -64,10 +63,9 @@ def item_history_page():
     # Add load more button if there are more items
     remaining_count = total_count - initial_page_size
     if view_history and remaining_count > 0:
-        last_uuid = view_history[-1].uuid
         load_more_button_args(
             args=args,
-            from_iid=last_uuid,
+            from_iid=next_cursor,
             gid=None,
             sort_by_desc=True,
             infinite_scroll=infinite_scroll,
@@ -0,0 +1,58 @@
+import requests
+from flask import Blueprint, make_response, request, send_file
+from galerie.media_proxy import verify_media_url
+from galerie_flask.media_cache import get_media_cache, media_etag
+from galerie_flask.media_streaming import open_upstream, iter_upstream, passthrough_response
+
+
+# upstream media never changes behind a url, so browsers and any CDN in front may keep it for long
+MEDIA_PROXY_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+
+media_proxy_bp = Blueprint('media_proxy', __name__)
+
+
+def _cache_headers(resp):
+    resp.headers['Cache-Control'] = f'public, max-age={MEDIA_PROXY_MAX_AGE_SECONDS}, immutable'
+    resp.headers['Accept-Ranges'] = 'bytes'
+    return resp
+
+
+@media_proxy_bp.route("/media_proxy")
+def media_proxy():
+    """Serves urls made by sign_media_url when GALERIE_MEDIA_PROXY_BASE_URL points here."""
+    # the signature is the only check, so <video> tags work without cookies
+    upstream_url = verify_media_url(
+        request.args.get('url', ''), request.args.get('exp', ''), request.args.get('sig', '')
+    )
+    if upstream_url is None:
+        return make_response('Invalid or expired media url', 403)
+
+    # the content behind a url is taken to never change, so the url alone identifies it
+    etag = media_etag(upstream_url)
+    if etag in request.if_none_match:
+        return _cache_headers(make_response('', 304))
+
+    cache = get_media_cache()
+    cached = cache.get(upstream_url) if cache else None
+    if cached:
+        # send_file answers Range requests itself
+        resp = send_file(cached.path, mimetype=cached.content_type, etag=etag, conditional=True)
+        return _cache_headers(resp)
+
+    # players open videos with "bytes=0-", which is the whole file and worth caching; seeks further in are relayed
+    range_header = request.headers.get('Range')
+    if range_header and range_header.replace(' ', '') == 'bytes=0-':
+        range_header = None
+
+    try:
+        upstream = open_upstream(upstream_url, range_header)
+    except requests.RequestException:
+        return make_response('Failed to fetch media', 502)
+
+    body = iter_upstream(upstream)
+    if cache and upstream.status_code == 200:
+        body = cache.fill(upstream_url, upstream.headers.get('Content-Type', 'application/octet-stream'), body)
+    resp = passthrough_response(upstream, body)
+    resp.set_etag(etag)
+    return _cache_headers(resp)
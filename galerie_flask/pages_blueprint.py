@@ -4,6 +4,9 @@ from sentry_sdk import capture_exception
 from flask import Blueprint, redirect, render_template, g, request, jsonify, make_response
 from flask_babel import _
 from galerie.utils import get_base_url
+from galerie.extraction_cache import extraction_cache
+from galerie_flask.history_retention import retention_metrics
+from galerie_flask.housekeeping import task_timings
 from .utils import requires_auth
 from .get_aggregator import get_aggregator
 from .miniflux_admin import MinifluxAdminException
@@ -149,4 +152,9 @@ def add_group_page():
 @catches_exceptions
 @requires_auth
 def debug_page():
-    return render_template('debug.html')
+    return render_template(
+        'debug.html',
+        extraction_cache_stats=extraction_cache.stats(),
+        history_retention_stats=retention_metrics.stats(),
+        housekeeping_timings=task_timings.stats(),
+    )
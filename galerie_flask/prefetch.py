@@ -0,0 +1,88 @@
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Iterable, List, Optional, Tuple
+from sentry_sdk import capture_exception
+from galerie.item import Item
+from galerie.rendered_item import RenderedItem, convert_rendered_items
+from galerie.rss_aggregator import RssAggregator
+from galerie.ttl_cache import TtlCache
+
+
+PREFETCH_MAX_WORKERS = 4
+# short enough that signed media URLs in a prefetched page are still far from expiring
+PREFETCH_TTL_SECONDS = 60
+PREFETCH_MAX_SIZE = 256
+# a prefetch still in flight is usually closer to done than a fresh fetch would be
+PREFETCH_WAIT_SECONDS = 10
+
+# (items, rendered items, iids of items without media)
+PrefetchedPage = Tuple[List[Item], List[RenderedItem], List[str]]
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix='prefetch')
+
+
+def _user_key(aggregator: RssAggregator) -> tuple:
+    return (aggregator.base_url, aggregator.username)
+
+
+def fetch_page(aggregator: RssAggregator, count: int, from_iid: str, gid: Optional[str], sort_by_desc: bool, include_read: bool, max_rendered_items: int) -> PrefetchedPage:
+    items = aggregator.get_items(
+        count=count,
+        from_iid_exclusive=from_iid,
+        group_id=gid,
+        sort_by_id_descending=sort_by_desc,
+        include_read=include_read,
+        max_media=max_rendered_items
+    )
+    rendered_items, iids_without_media = convert_rendered_items(items, max_rendered_items)
+    return items, rendered_items, iids_without_media
+
+
+class NextPagePrefetcher(object):
+    """Fetches and converts the page after a cursor in the background, before the browser asks for it."""
+
+    def __init__(self):
+        self._slots: TtlCache[tuple, Future] = TtlCache(ttl_seconds=PREFETCH_TTL_SECONDS, max_size=PREFETCH_MAX_SIZE)
+
+    @staticmethod
+    def _key(aggregator: RssAggregator, count: int, from_iid: str, gid: Optional[str], sort_by_desc: bool, include_read: bool, max_rendered_items: int) -> tuple:
+        return _user_key(aggregator) + (count, from_iid, gid, sort_by_desc, include_read, max_rendered_items)
+
+    def schedule(self, aggregator: RssAggregator, count: int, from_iid: str, gid: Optional[str], sort_by_desc: bool, include_read: bool, max_rendered_items: int):
+        if not from_iid:
+            return
+        key = self._key(aggregator, count, from_iid, gid, sort_by_desc, include_read, max_rendered_items)
+        if self._slots.get(key) is not None:
+            return
+        self._slots.set(key, _executor.submit(
+            fetch_page, aggregator, count, from_iid, gid, sort_by_desc, include_read, max_rendered_items))
+
+    def get_page(self, aggregator: RssAggregator, count: int, from_iid: str, gid: Optional[str], sort_by_desc: bool, include_read: bool, max_rendered_items: int) -> PrefetchedPage:
+        """The prefetched page for this cursor if there is a usable one, otherwise the page fetched right now."""
+        key = self._key(aggregator, count, from_iid, gid, sort_by_desc, include_read, max_rendered_items)
+        future = self._slots.pop(key)
+        if future is not None:
+            try:
+                return future.result(timeout=PREFETCH_WAIT_SECONDS)
+            except TimeoutError:
+                pass
+            except Exception as e:
+                capture_exception(e)
+        return fetch_page(aggregator, count, from_iid, gid, sort_by_desc, include_read, max_rendered_items)
+
+    def invalidate(self, aggregator: RssAggregator, iids: Optional[Iterable[str]] = None):
+        """Drop the user's prefetched pages that contain any of `iids`, or all of them when no iids are given."""
+        user_key = _user_key(aggregator)
+        iids = set(iids) if iids is not None else None
+
+        def is_affected(key: tuple, future: Future) -> bool:
+            if key[:len(user_key)] != user_key:
+                return False
+            if iids is None or not future.done() or future.exception() is not None:
+                return True
+            items, _, _ = future.result()
+            return any(item.iid in iids for item in items)
+
+        self._slots.pop_where(is_affected)
+
+
+next_page_prefetcher = NextPagePrefetcher()
@@ -1,8 +1,9 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from functools import wraps
 from flask import request, g, redirect
 from galerie.rendered_item import RenderedItem
 from .get_aggregator import get_aggregator
+from .feed_icon_store import feed_icon_store
 
 
 DEFAULT_MAX_ITEMS = 20
@@ -19,7 +20,8 @@ def requires_auth(f):
             if request.path.startswith('/actions'):
                 return redirect('/login')
             return redirect('/login?next=' + request.full_path)
-        g.aggregator = aggregator
+        # a fresh view per request, so request-scoped memoization starts empty
+        g.aggregator = aggregator.for_request()
         return f(*args, **kwargs)
     return decorated_function
 
@@ -45,13 +47,11 @@ def load_more_button_args(
     })
 
 
-def items_args(args: dict, rendered_items: List[RenderedItem], should_show_feed_title: bool, should_show_feed_group: bool, no_text_mode: bool, iids_without_media: List[str]):
-    rendered_feed_icons = {}
-    for ri in rendered_items:
-        fid = ri.fid
-        if fid in rendered_feed_icons:
-            continue
-        rendered_feed_icons[fid] = g.aggregator.get_feed_icon(fid)
+def items_args(args: dict, rendered_items: Iterable[RenderedItem], should_show_feed_title: bool, should_show_feed_group: bool, no_text_mode: bool, iids_without_media: List[str], fids: Optional[Iterable[str]] = None):
+    # pass the fids when rendered_items is a generator that the template should consume lazily
+    fids = set(fids) if fids is not None else {ri.fid for ri in rendered_items}
+    feed_icon_store.warm_up(fids)
+    rendered_feed_icons = {fid: feed_icon_store.url_for(fid) for fid in fids}
 
     args.update({
         "items": rendered_items,
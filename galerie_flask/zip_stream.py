@@ -0,0 +1,49 @@
+import time
+import zipfile
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class _Sink(object):
+    """Write-only, unseekable file for ZipFile that hands out whatever was written since the last `take()`."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(members: Iterable[Tuple[str, BinaryIO, int]]) -> Iterator[bytes]:
+    """The bytes of a zip archive of (name, file, size) members, produced as the members come in."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, file, size in members:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = size
+            with archive.open(info, 'w') as member:
+                while True:
+                    chunk = file.read(ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    member.write(chunk)
+                    yield from _nonempty(sink.take())
+            yield from _nonempty(sink.take())
+    yield from _nonempty(sink.take())
+
+
+def _nonempty(data: bytes) -> Iterator[bytes]:
+    if data:
+        yield data
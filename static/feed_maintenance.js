@@ -46,3 +46,92 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initialize button state
     updateButtonState();
 });
+
+document.addEventListener('DOMContentLoaded', async () => {
+    // X/Twitter account statuses not known when the page was rendered are checked in the background,
+    // move each feed to its section as soon as the status comes in
+    const MAX_POLLS = 20;
+
+    const pendingFeeds = new Map();
+    document.querySelectorAll('.dead-feed[data-twitter-handle]').forEach(feed => {
+        const handle = feed.dataset.twitterHandle;
+        pendingFeeds.set(handle, [...(pendingFeeds.get(handle) || []), feed]);
+    });
+
+    function moveFeed(feed, status) {
+        const section = document.querySelector(`.dead-feed-reason[data-reason="x_${status}"]`);
+        if (!section) {
+            return;
+        }
+        const previousSection = feed.closest('.dead-feed-reason');
+        section.appendChild(feed);
+        section.style.display = '';
+        if (previousSection && !previousSection.querySelector('.dead-feed')) {
+            previousSection.style.display = 'none';
+        }
+    }
+
+    for (let poll = 0; poll < MAX_POLLS && pendingFeeds.size > 0; poll++) {
+        const handles = Array.from(pendingFeeds.keys()).join(',');
+        let statuses;
+        try {
+            const resp = await fetch(`/feed_maintenance/twitter_handle_statuses?handles=${encodeURIComponent(handles)}`);
+            if (!resp.ok) {
+                return;
+            }
+            statuses = await resp.json();
+        } catch (e) {
+            return;
+        }
+        for (const [handle, status] of Object.entries(statuses)) {
+            if (status) {
+                (pendingFeeds.get(handle) || []).forEach(feed => moveFeed(feed, status));
+            }
+            pendingFeeds.delete(handle);
+        }
+    }
+});
+
+document.addEventListener('DOMContentLoaded', () => {
+    // dead feeds are refreshed by a background job, show its progress on the button until it is done
+    const POLL_INTERVAL_MS = 1000;
+    // jobs lost with their worker are reported as failed well before this, it only guards against endless polling
+    const MAX_JOB_POLLS = 15 * 60;
+    const refreshButton = document.getElementById('refresh-all-dead-feeds-button');
+    if (!refreshButton) {
+        return;
+    }
+
+    document.body.addEventListener('job_started', async (event) => {
+        const jobUuid = event.detail.value;
+        const originalText = refreshButton.childNodes[0].textContent;
+
+        for (let poll = 0; poll < MAX_JOB_POLLS; poll++) {
+            await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+            // htmx re-enables the button once the request that started the job is done
+            refreshButton.disabled = true;
+            let job;
+            try {
+                const resp = await fetch(`/actions/job_status?job=${encodeURIComponent(jobUuid)}`);
+                if (!resp.ok) {
+                    break;
+                }
+                job = await resp.json();
+            } catch (e) {
+                continue;
+            }
+
+            if (job.status === 'succeeded' || job.status === 'failed') {
+                document.body.dispatchEvent(new CustomEvent('toast', { detail: { value: job.message } }));
+                setTimeout(() => window.location.reload(), POLL_INTERVAL_MS);
+                return;
+            }
+            if (job.total > 0) {
+                refreshButton.childNodes[0].textContent = `${originalText.trim()} (${job.succeeded + job.failed}/${job.total}) `;
+            }
+        }
+
+        refreshButton.childNodes[0].textContent = originalText;
+        refreshButton.disabled = false;
+    });
+});
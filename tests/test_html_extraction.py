@@ -0,0 +1,74 @@
+import random
+from pathlib import Path
+import pytest
+from bs4 import BeautifulSoup
+from galerie.html_extraction import extract_html
+
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'html_extraction'
+
+# pieces of markup that are glued together at random, covering what trips HTML parsers up
+FUZZ_FRAGMENTS = [
+    '<p>', '</p>', '<div>', '</div>', 'hello', ' world ', '&amp;', '&#147;', '&nbsp;', '&foo;', '&#x41;', '<br>',
+    '<br/>', '</br>', '<img src="a.jpg">', '<img src="b.jpg"/>', '</img>', '<img>', '<video poster="p.jpg">',
+    '</video>', '<source src="v.mp4">', '<source>', '<source src="">', '<script>var x=1;</script>', '<script>',
+    '</script>', '<style>.a{}</style>', '<!-- c -->', '<![CDATA[cd]]>', '<!DOCTYPE html>', '<a href="x">link</a>',
+    '<span>', '</span>', 'RT @foo : text\n', '<template>t</template>', '<rt>r</rt>', '<b>bold</b>', '\n\n',
+    '<video><source src="w.mp4"></video>', '<img src=x alt="y">', '<p>para', '<IMG SRC="C.JPG">', 'text<',
+    '< not a tag', '&lt;', '<?pi?>', '</nope>',
+]
+
+
+def beautifulsoup_extraction(html: str):
+    """What entry_dict_to_item and convert_rendered_item computed before extract_html replaced them."""
+    text = BeautifulSoup(html, 'html.parser').get_text(" ", strip=True)
+
+    media = []
+    image_count, video_count = 0, 0
+    for element in BeautifulSoup(html, 'html.parser').find_all(['img', 'video']):
+        if element.name == 'img':
+            image_count += 1
+            media.append(('image', element.get('src', ''), ''))
+            continue
+        source_element = element.find('source')
+        if not source_element or not source_element.get('src'):
+            continue
+        video_count += 1
+        media.append(('video', source_element.get('src', ''), element.get('poster', '')))
+    return text, media, image_count, video_count
+
+
+def single_pass_extraction(html: str):
+    extracted = extract_html(html)
+    media = [(m.kind, m.src, m.poster) for m in extracted.media]
+    return extracted.text, media, extracted.image_count, extracted.video_count
+
+
+@pytest.fixture(autouse=True)
+def html_parser_backend(monkeypatch):
+    # only the html.parser backend promises identical output on malformed markup
+    monkeypatch.delenv('HTML_EXTRACTION_BACKEND', raising=False)
+
+
+@pytest.mark.parametrize('path', sorted(FIXTURES_DIR.glob('*.html')), ids=lambda path: path.stem)
+def test_matches_beautifulsoup_on_fixtures(path: Path):
+    html = path.read_text()
+    assert single_pass_extraction(html) == beautifulsoup_extraction(html)
+
+
+def test_matches_beautifulsoup_on_fuzzed_markup():
+    rng = random.Random(7)
+    for _ in range(2000):
+        html = ''.join(rng.choice(FUZZ_FRAGMENTS) for _ in range(rng.randint(0, 25)))
+        assert single_pass_extraction(html) == beautifulsoup_extraction(html), html
+
+
+def test_media_cap_keeps_the_first_media_and_exact_counts():
+    rng = random.Random(11)
+    for _ in range(2000):
+        html = ''.join(rng.choice(FUZZ_FRAGMENTS) for _ in range(rng.randint(0, 25)))
+        text, media, image_count, video_count = single_pass_extraction(html)
+        for max_media in range(4):
+            capped = extract_html(html, max_media)
+            assert [(m.kind, m.src, m.poster) for m in capped.media] == media[:max_media], html
+            assert (capped.text, capped.image_count, capped.video_count) == (text, image_count, video_count), html